@@ -0,0 +1,159 @@
+import json
+import random
+import functools
+import pathlib
+
+from pyrugby.reddit.constants import FLAIRS
+
+FIXTURE_DIR = pathlib.Path(__file__).parent / 'fixtures'
+
+TEAM_IDS = (39, 40)
+KICKOFF_MILLIS = 1569661200000
+
+# (type, label, points, relative weight)
+TIMELINE_EVENTS = (
+    ('T5', 'Try', 5, 4),
+    ('C2', 'Conversion', 2, 3),
+    ('P3', 'Penalty', 3, 4),
+    ('D3', 'Drop Goal', 3, 1),
+    ('Miss Con', 'Missed Conversion', 0, 2),
+    ('Miss Pen', 'Missed Penalty', 0, 2),
+    ('Sub On', 'Sub On', 0, 6),
+    ('Sub Off', 'Sub Off', 0, 6),
+    ('Yellow', 'Yellow Card', 0, 1),
+    ('Red', 'Red Card', 0, 1),
+)
+
+WORDS = (
+    'ref', 'scrum', 'lineout', 'penalty', 'try', 'knock', 'on', 'forward',
+    'pass', 'offside', 'ruck', 'maul', 'kick', 'the', 'a', 'what', 'was',
+    'that', 'bloody', 'hell', 'shit', 'fucking', 'brilliant', 'terrible',
+    'game', 'match', 'wales', 'england', 'ireland', 'france', 'tmo', 'yellow',
+)
+
+MD_DECORATIONS = (
+    '{}', '**{}**', '*{}*', '[{}](https://reddit.com)', '> {}', '`{}`',
+    '~~{}~~', '{}\n\n{}',
+)
+
+
+def synthetic_timeline(nevents=500, missing=0.3, seed=0):
+    rng = random.Random(seed)
+    types = [e[:3] for e in TIMELINE_EVENTS]
+    weights = [e[3] for e in TIMELINE_EVENTS]
+    timeline = []
+    secs = 0
+    for i in range(nevents):
+        secs += rng.randint(0, max(1, 9600 // nevents))
+        etype, label, points = rng.choices(types, weights)[0]
+        event = {
+            'phase': 'L1' if secs < 2400 else 'L2',
+            'time': {'secs': secs},
+            'type': etype,
+            'typeLabel': label,
+            'teamIndex': rng.randint(0, 1),
+            'playerId': rng.randint(1000, 1060),
+            'points': points,
+            'position': {
+                'x': rng.randint(0, 100), 'y': rng.randint(0, 100),
+                'ex': rng.randint(0, 100), 'ey': rng.randint(0, 100),
+                'm': rng.randint(0, 100),
+            },
+            'info': [],
+        }
+        if rng.random() >= missing:
+            event['timestamp'] = {
+                'millis': KICKOFF_MILLIS + secs * 1000, 'gmtOffset': 1.0
+            }
+        timeline.append(event)
+    return {
+        'match': {
+            'matchId': 24000 + seed,
+            'status': 'C',
+            'teams': [{'id': t} for t in TEAM_IDS],
+        },
+        'timeline': timeline,
+    }
+
+
+def _markdown_body(rng):
+    words = rng.choices(WORDS, k=rng.randint(3, 40))
+    decoration = rng.choice(MD_DECORATIONS)
+    half = len(words) // 2
+    return decoration.format(' '.join(words[:half]), ' '.join(words[half:]))
+
+
+def synthetic_pushshift_comments(ncomments=1000, seed=0):
+    rng = random.Random(seed)
+    flairs = [f for f in FLAIRS if f is not None]
+    comments = []
+    created = KICKOFF_MILLIS // 1000
+    for i in range(ncomments):
+        created += rng.randint(0, 3)
+        comment = {
+            'id': f'f{i:06x}',
+            'author': f'user{rng.randint(0, ncomments // 5)}',
+            'author_flair_css_class': None,
+            'author_flair_richtext': [],
+            'body': _markdown_body(rng),
+            'created_utc': created,
+            'score': rng.randint(-5, 50),
+            'parent_id': 't3_abc123',
+            'link_id': 't3_abc123',
+        }
+        flair = rng.choice(flairs + [None, 'unknown-flair'])
+        if flair is None:
+            pass
+        elif flair.startswith(':'):
+            comment['author_flair_richtext'] = [
+                {'e': 'emoji', 'a': flair}, {'e': 'text', 't': ' fan'}
+            ]
+        else:
+            comment['author_flair_css_class'] = flair
+        comments.append(comment)
+    return comments
+
+
+def _load_json(path):
+    with open(path, 'r') as fjson:
+        return json.load(fjson)
+
+
+def sample(kind):
+    # Small hand written payloads in the recorded formats, which are not
+    # captures of real API responses
+    return functools.partial(_load_json, FIXTURE_DIR / f'sample_{kind}.json')
+
+
+def recorded(prefix):
+    return {
+        path.stem[len(prefix) + 1:]: functools.partial(_load_json, path)
+        for path in sorted(FIXTURE_DIR.glob(f'{prefix}_*.json'))
+    }
+
+
+# Fixtures are returned as loaders so only the selected ones are built
+def timelines(sizes=(500, 5000)):
+    fixtures = {
+        f'synthetic{n}': functools.partial(synthetic_timeline, n)
+        for n in sizes
+    }
+    fixtures['sample'] = sample('timeline')
+    fixtures.update(
+        (f'recorded-{name}', loader)
+        for name, loader in recorded('timeline').items()
+    )
+    return fixtures
+
+
+def pushshift_dumps(sizes=(1000, 10000, 50000)):
+    fixtures = {
+        f'synthetic{n}': functools.partial(synthetic_pushshift_comments, n)
+        for n in sizes
+    }
+    fixtures['sample'] = sample('pushshift')
+    fixtures.update(
+        (f'recorded-{name}', loader)
+        for name, loader in recorded('pushshift').items()
+    )
+    return fixtures
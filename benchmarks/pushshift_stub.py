@@ -0,0 +1,112 @@
+"""A local stand-in for the Pushshift comment search API.
+
+Each request returns comments created since the previous request, at a
+steady rate, so the stream pipeline can be exercised offline:
+
+    python -m benchmarks.pushshift_stub --port 8765 --rate 20
+    pyrugby-match-thread stream -s pushshift \\
+        --pushshift-url "http://127.0.0.1:8765/reddit/{search_type}/search" \\
+        --no-vader --no-profanity -d 60 abc123
+"""
+import json
+import time
+import random
+import itertools
+import threading
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from . import fixtures
+
+
+class StubPushshift():
+    def __init__(self, rate=20, late=0.0, seed=0):
+        # rate: comments created per second
+        # late: fraction of comments only returned on the following request
+        self.rate = rate
+        self.late = late
+        self._rng = random.Random(seed)
+        self._ids = itertools.count()
+        self._created = []
+        self._held = []
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def _generate(self):
+        now = time.time()
+        n = int((now - self._last) * self.rate)
+        if not n:
+            return
+        self._last += n / self.rate
+        for comment in fixtures.synthetic_pushshift_comments(
+            n, seed=self._rng.randrange(1 << 30)
+        ):
+            comment['id'] = f'stub{next(self._ids)}'
+            comment['created_utc'] = int(now)
+            if self._rng.random() < self.late:
+                self._held.append(comment)
+            else:
+                self._created.append(comment)
+
+    def search(self, after=None, size=1000):
+        with self._lock:
+            self._generate()
+            data = [
+                c for c in self._created
+                if after is None or c['created_utc'] > after
+            ]
+            # Late comments arrive with their original timestamps
+            self._created.extend(self._held)
+            self._held = []
+        data.sort(key=lambda c: c['created_utc'])
+        return data[:size]
+
+
+def make_server(stub, host='127.0.0.1', port=0):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            after = query.get('after')
+            data = stub.search(
+                int(after[0]) if after else None,
+                int(query.get('size', [1000])[0])
+            )
+            body = json.dumps({'data': data}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def url(server):
+    host, port = server.server_address[:2]
+    return f'http://{host}:{port}/reddit/{{search_type}}/search'
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='Serve a local Pushshift stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument(
+        '--rate', type=float, default=20, help='Comments per second'
+    )
+    parser.add_argument(
+        '--late', type=float, default=0.0,
+        help='Fraction of comments returned a request late'
+    )
+    args = parser.parse_args(argv)
+    server = make_server(StubPushshift(args.rate, args.late), args.host,
+                         args.port)
+    print(f'Serving {url(server)}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import gc
+import json
+import sys
+import time
+import logging
+import platform
+import statistics
+import tracemalloc
+from argparse import ArgumentParser
+
+from .suite import all_benchmarks
+
+log = logging.getLogger(__name__)
+
+
+def get_parser():
+    parser = ArgumentParser(
+        description='Run the offline pyrugby benchmark suite'
+    )
+    parser.add_argument(
+        '-k', '--filter', action='append',
+        help='Only run benchmarks whose name contains this (repeatable)'
+    )
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=3,
+        help='Timed runs per benchmark (Defaults to 3)'
+    )
+    parser.add_argument(
+        '--timeline-sizes', type=int, nargs='+', default=[500, 5000],
+        help='Synthetic timeline lengths in events'
+    )
+    parser.add_argument(
+        '--comment-sizes', type=int, nargs='+',
+        default=[1000, 10000, 50000],
+        help='Synthetic Pushshift dump sizes in comments'
+    )
+    parser.add_argument(
+        '--no-memory', action='store_true',
+        help='Skip the (slower) peak memory measurement run'
+    )
+    parser.add_argument('-o', '--save', help='Save results to this JSON file')
+    parser.add_argument(
+        '-c', '--compare', help='Compare against a saved baseline JSON file'
+    )
+    parser.add_argument(
+        '-t', '--threshold', type=float, default=0.1,
+        help='Relative slowdown/memory growth counted as a regression '
+        '(Defaults to 0.1)'
+    )
+    return parser
+
+
+def measure(bench, repeat=3, memory=True):
+    times = []
+    for _ in range(repeat):
+        state = bench.setup()
+        gc.collect()
+        start = time.perf_counter()
+        bench.run(state)
+        times.append(time.perf_counter() - start)
+        del state
+    items = bench.items()
+    result = {
+        'items': items,
+        'min': min(times),
+        'median': statistics.median(times),
+        'throughput': items / statistics.median(times) if items else None,
+    }
+    if memory:
+        state = bench.setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            bench.run(state)
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def compare(results, baseline, threshold=0.1):
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        checks = [('median', 'time')]
+        if res.get('peak_bytes') and base.get('peak_bytes'):
+            checks.append(('peak_bytes', 'memory'))
+        for key, label in checks:
+            ratio = res[key] / base[key] if base[key] else float('inf')
+            res[f'{key}_ratio'] = ratio
+            if ratio > 1 + threshold:
+                regressions.append((name, label, ratio))
+    return regressions
+
+
+def _format_row(name, res):
+    peak = res.get('peak_bytes')
+    ratio = res.get('median_ratio')
+    return '{:<48} {:>10.4f}s {:>12} {:>10} {:>8}'.format(
+        name, res['median'],
+        f'{res["throughput"]:.0f}/s' if res['throughput'] else '-',
+        f'{peak / 2**20:.1f}MiB' if peak is not None else '-',
+        f'x{ratio:.2f}' if ratio is not None else ''
+    )
+
+
+def main(args):
+    benches = [
+        b for b in all_benchmarks(args.timeline_sizes, args.comment_sizes)
+        if not args.filter or any(f in b.name for f in args.filter)
+    ]
+    results = {}
+    for bench in benches:
+        log.info('Running %s', bench.name)
+        results[bench.name] = measure(
+            bench, args.repeat, memory=not args.no_memory
+        )
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, 'r') as bjson:
+            baseline = json.load(bjson)['results']
+        regressions = compare(results, baseline, args.threshold)
+
+    print('{:<48} {:>11} {:>12} {:>10} {:>8}'.format(
+        'benchmark', 'median', 'throughput', 'peak', 'vs base'
+    ))
+    for name, res in results.items():
+        print(_format_row(name, res))
+
+    if args.save:
+        with open(args.save, 'w') as rjson:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'created': time.time(),
+                'results': results,
+            }, rjson, indent=2)
+        log.info('Results saved to %s', args.save)
+
+    for name, label, ratio in regressions:
+        print(f'REGRESSION: {name} {label} x{ratio:.2f}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main(get_parser().parse_args()))
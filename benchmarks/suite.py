@@ -0,0 +1,195 @@
+import logging
+import functools
+import importlib.util
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from pyrugby.cmsapi import Timeline
+import pyrugby.reddit
+from pyrugby.reddit import tokens
+
+from . import fixtures
+
+log = logging.getLogger(__name__)
+
+PROFANITIES = ('shit', 'fucking', 'hell', 'bloody')
+
+
+@dataclass
+class Benchmark():
+    name: str
+    # Called (untimed) before every run to build fresh state
+    setup: Callable[[], Any]
+    run: Callable[[Any], Any]
+    # Number of items processed per run, for throughput
+    items: Callable[[], int]
+
+
+def _cached(loader):
+    return functools.lru_cache(maxsize=None)(loader)
+
+
+def _count(loader):
+    return len(loader())
+
+
+def _count_events(loader):
+    return len(loader()['timeline'])
+
+
+def _parsed_timeline(data):
+    timeline = Timeline(0, data=data)
+    timeline.events
+    return timeline
+
+
+def _praw_like(comments):
+    # Every other comment as PRAW would return it, plus some PRAW only ones
+    praw_comms = [
+        {
+            'id': c['id'], 'author': c['author'], 'controversiality': 0,
+            'score_praw': c['score'], 'score_hidden': False, 'depth': 0,
+            'created_utc': float(c['created_utc']), 'markdown': c['body'],
+            'html': None, 'removed_praw': False, 'praw': True,
+        }
+        for c in comments[::2]
+    ]
+    praw_comms.extend(
+        dict(p, id=f'p{i:06x}') for i, p in enumerate(praw_comms[::10])
+    )
+    return praw_comms
+
+
+def _tokenize(comments):
+    tokens.token_stats_batch(
+        [c['body'] for c in comments], vocabulary=PROFANITIES
+    )
+
+
+def _flair_lookup(comments):
+    flairs = pyrugby.reddit.FlairRegistry()
+    for comment in comments:
+        flairs.get(flairs.identify(comment))
+
+
+def _profanities(comments):
+    # The add_profanities stage without the DataFrame: candidate words are
+    # checked once each with profanity_filter's default dictionaries
+    from pyrugby.cli.process import get_profanity_map
+
+    _, candidates = tokens.token_stats_batch(
+        [c['body'] for c in comments], vocabulary=None
+    )
+    profane = get_profanity_map(set().union(*candidates))
+    return [
+        [profane[w] for w in words if w in profane] for words in candidates
+    ]
+
+
+def _plaintext(comments):
+    for comment in comments:
+        pyrugby.reddit.comment_md_to_plaintext(comment['body'])
+
+
+def timeline_benchmarks(sizes=(500, 5000)):
+    for name, loader in fixtures.timelines(sizes).items():
+        data = _cached(loader)
+        nevents = functools.partial(_count_events, data)
+        yield Benchmark(
+            f'cmsapi.parse_timeline[{name}]',
+            lambda data=data: Timeline(0, data=data()),
+            lambda timeline: timeline.events,
+            nevents
+        )
+        yield Benchmark(
+            f'cmsapi.infill_timestamps[{name}]',
+            lambda data=data: _parsed_timeline(data()),
+            lambda timeline: timeline.infill_timestamps(),
+            nevents
+        )
+        yield Benchmark(
+            f'cmsapi.event_times[{name}]',
+            lambda data=data: _parsed_timeline(data()),
+            lambda timeline: timeline.event_times(),
+            nevents
+        )
+        yield Benchmark(
+            f'cmsapi.calculate_scores[{name}]',
+            lambda data=data: _parsed_timeline(data()),
+            lambda timeline: timeline.calculate_scores(),
+            nevents
+        )
+
+
+def reddit_benchmarks(sizes=(1000, 10000, 50000)):
+    for name, loader in fixtures.pushshift_dumps(sizes).items():
+        comments = _cached(loader)
+        ncomments = functools.partial(_count, comments)
+        yield Benchmark(
+            f'reddit.flair[{name}]',
+            comments, _flair_lookup, ncomments
+        )
+        yield Benchmark(
+            f'reddit.plaintext[{name}]',
+            comments, _plaintext, ncomments
+        )
+        yield Benchmark(
+            f'reddit.tokenize[{name}]',
+            comments, _tokenize, ncomments
+        )
+        praw_comms = _cached(lambda comments=comments: _praw_like(comments()))
+        yield Benchmark(
+            f'reddit.merge[{name}]',
+            lambda comments=comments, praw_comms=praw_comms: (
+                comments(), praw_comms()
+            ),
+            lambda state: pyrugby.reddit.merge_comments(*state),
+            ncomments
+        )
+
+
+def profanity_benchmarks(sizes=(1000, 10000)):
+    if importlib.util.find_spec('profanity_filter') is None:
+        log.warning('profanity_filter is not installed, skipping profanity')
+        return
+    for name, loader in fixtures.pushshift_dumps(sizes).items():
+        comments = _cached(loader)
+        yield Benchmark(
+            f'reddit.profanity[{name}]',
+            comments, _profanities, functools.partial(_count, comments)
+        )
+
+
+def _reaction_state(timeline_data, comments):
+    import pandas as pd
+
+    timeline = _parsed_timeline(timeline_data)
+    timeline.infill_timestamps()
+    return timeline, pd.DataFrame(comments)
+
+
+def reaction_benchmarks(sizes=(1000, 10000, 50000), nevents=200):
+    from pyrugby.reactions import event_reactions
+
+    timeline_data = _cached(
+        functools.partial(fixtures.synthetic_timeline, nevents)
+    )
+    for name, loader in fixtures.pushshift_dumps(sizes).items():
+        comments = _cached(loader)
+        yield Benchmark(
+            f'reactions.event_reactions[{name}]',
+            lambda comments=comments: _reaction_state(
+                timeline_data(), comments()
+            ),
+            lambda state: event_reactions(*state),
+            functools.partial(_count, comments)
+        )
+
+
+def all_benchmarks(
+    timeline_sizes=(500, 5000), comment_sizes=(1000, 10000, 50000)
+):
+    yield from timeline_benchmarks(timeline_sizes)
+    yield from reddit_benchmarks(comment_sizes)
+    yield from profanity_benchmarks(comment_sizes)
+    yield from reaction_benchmarks(comment_sizes)
@@ -0,0 +1,226 @@
+import json
+import logging
+import pathlib
+import importlib
+from argparse import ArgumentParser
+
+from .. import instrument
+
+log = logging.getLogger(__name__)
+
+# Kept here rather than imported from `storage` so that building the parser
+# does not import pandas
+FORMATS = ('csv', 'parquet', 'feather')
+
+# Sub-command modules, only imported when their command is run
+COMMANDS = {
+    'scrape': 'pyrugby.cli.scrape',
+    'process': 'pyrugby.cli.process',
+    'stream': 'pyrugby.cli.stream',
+}
+
+
+def setup_logging(level=logging.INFO):
+    pkg_log = logging.getLogger('pyrugby')
+    pkg_log.setLevel(level)
+    ch = logging.StreamHandler()
+    formatter = logging.Formatter(
+        "%(asctime)s | %(name)s | %(levelname)7s | %(message)s",
+        "%Y-%m-%d %H:%M:%S"
+    )
+    ch.setFormatter(formatter)
+    pkg_log.addHandler(ch)
+
+
+def get_parser():
+    parser = ArgumentParser(
+        description=(
+            'Scrape comments from /r/rugbyunion Match Threads'
+            ' and perform sentiment analysis'
+        )
+    )
+    parser.add_argument(
+        '--metrics',
+        help='Write stage timings and counters to this file '
+        '(Prometheus text format for .prom, otherwise JSON)'
+    )
+    parser.add_argument(
+        '--profile', choices=instrument.PROFILERS,
+        help='Profile each stage and log the results'
+    )
+    parser.add_argument(
+        '--flair-templates',
+        help='A JSON dump of the subreddit\'s flair templates to merge '
+        'with the known flairs'
+    )
+    subparsers = parser.add_subparsers(
+        title='Sub-commands', dest='command'
+    )
+    scraper = subparsers.add_parser('scrape', help='Scrape comments')
+    scraper.add_argument(
+        '-u', '--url', action='store_true',
+        help='ID is a Reddit Submission URL'
+    )
+    scraper.add_argument(
+        '-o', '--outdir',
+        help='Optional output directory for final comment file '
+        '(Defaults to current working directory'
+    )
+    scraper.add_argument(
+        '-f', '--format', choices=FORMATS, default='csv',
+        help='Output file format (Defaults to csv)'
+    )
+    scraper.add_argument(
+        '-b', '--batch', action='store_true',
+        help='ID is a file of Submission IDs/URLs, one per line'
+    )
+    scraper.add_argument(
+        '-w', '--workers', type=int, default=4,
+        help='Number of submissions to scrape at once in batch mode'
+    )
+    scraper.add_argument(
+        '--update', action='store_true',
+        help='If the output file exists, only fetch newer Pushshift '
+        'comments and append them'
+    )
+    scraper.add_argument(
+        '--skip-known', action='store_true',
+        help='Only expand PRAW comments which Pushshift has not returned'
+    )
+    scraper.add_argument(
+        '--expand-workers', type=int, default=4,
+        help='Concurrent PRAW "more comments" requests per submission'
+    )
+    scraper.add_argument(
+        '--max-requests', type=int,
+        help='Maximum PRAW "more comments" requests per submission'
+    )
+    scraper.add_argument(
+        '--time-budget', type=float,
+        help='Maximum seconds to spend expanding PRAW comments'
+    )
+    scraper.add_argument(
+        'subid', help='URL or Submission ID (or a file of them with --batch)'
+    )
+
+    processer = subparsers.add_parser(
+        'process', help='Add fields to scraped comments'
+    )
+    processer.add_argument(
+        'input', help='CSV/Parquet/Feather file of comments from "scrape"'
+    )
+    processer.add_argument(
+        'update', choices=['google', 'vader', 'profanity', 'flair'],
+        nargs='+', help='Which fields to add/update'
+    )
+    processer.add_argument(
+        '-p', '--profanities',
+        help='A JSON file containing profanities indexed by their "root"'
+    )
+    processer.add_argument(
+        '-j', '--processes', type=int,
+        help='Worker processes for the vader and profanity stages'
+    )
+    processer.add_argument(
+        '-f', '--format', choices=FORMATS,
+        help='Output file format (Defaults to the input format)'
+    )
+
+    streamer = subparsers.add_parser(
+        'stream', help='Follow a live match thread'
+    )
+    streamer.add_argument(
+        '-u', '--url', action='store_true',
+        help='ID is a Reddit Submission URL'
+    )
+    streamer.add_argument(
+        '-s', '--source', choices=['praw', 'pushshift'], default='praw',
+        help='Stream comments from PRAW or poll Pushshift (Defaults to praw)'
+    )
+    streamer.add_argument(
+        '--pushshift-url',
+        help='Pushshift search URL template, e.g. for a local stub '
+        '("http://localhost:8000/reddit/{search_type}/search")'
+    )
+    streamer.add_argument(
+        '-i', '--interval', type=float, default=5,
+        help='Seconds between Pushshift polls, or to wait after an empty '
+        'PRAW stream response (Defaults to 5)'
+    )
+    streamer.add_argument(
+        '-m', '--window', type=int, default=10,
+        help='Minutes of per-minute aggregates to keep (Defaults to 10)'
+    )
+    streamer.add_argument(
+        '-w', '--workers', type=int, default=4,
+        help='Comments processed at once (Defaults to 4)'
+    )
+    streamer.add_argument(
+        '-q', '--queue-size', type=int, default=1000,
+        help='Maximum comments waiting to be processed (Defaults to 1000)'
+    )
+    streamer.add_argument(
+        '-r', '--report-every', type=float, default=60,
+        help='Seconds between aggregate reports (Defaults to 60)'
+    )
+    streamer.add_argument(
+        '-d', '--duration', type=float,
+        help='Stop after this many seconds (Defaults to running until '
+        'interrupted)'
+    )
+    streamer.add_argument(
+        '-o', '--output',
+        help='Append each aggregate report to this JSON lines file'
+    )
+    streamer.add_argument(
+        '-p', '--profanities',
+        help='A JSON file containing profanities indexed by their "root"'
+    )
+    streamer.add_argument(
+        '--no-vader', action='store_true', help='Skip VADER sentiment'
+    )
+    streamer.add_argument(
+        '--no-profanity', action='store_true',
+        help='Skip profanity detection'
+    )
+    streamer.add_argument('subid', help='URL or Submission ID')
+    return parser
+
+
+def main(args):
+    module = COMMANDS.get(args.command)
+    if module is None:
+        print('Unrecognised command!')
+        return
+    from ..reddit.flairs import FlairRegistry
+    args.flairs = FlairRegistry.load(args.flair_templates)
+    importlib.import_module(module).main(args)
+
+
+def report_metrics(args):
+    instrument.METRICS.log_summary()
+    if args.profile:
+        log.info("Stage profiles:\n%s", instrument.METRICS.profile_report())
+    if args.metrics:
+        metrics_path = pathlib.Path(args.metrics)
+        if metrics_path.suffix == '.prom':
+            metrics_path.write_text(instrument.METRICS.to_prometheus())
+        else:
+            metrics_path.write_text(
+                json.dumps(instrument.METRICS.summary(), indent=2)
+            )
+        log.info("Metrics written to %s", metrics_path)
+
+
+def run(argv=None):
+    setup_logging()
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.profile:
+        instrument.METRICS.enable_profiling(args.profile)
+    try:
+        main(args)
+    finally:
+        if getattr(args, 'flairs', None) is not None:
+            args.flairs.report()
+        report_metrics(args)
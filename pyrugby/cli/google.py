@@ -0,0 +1,68 @@
+import time
+import logging
+import threading
+import multiprocessing.dummy
+
+from google.cloud import language
+
+from .. import instrument
+
+log = logging.getLogger(__name__)
+
+
+# Class to handle mutliple Google Natural Language Requests
+# Implements rate-limiting and error handling
+class GoogleNaturalLanguageBatch():
+    def __init__(self, threads=250, limit=500, every=60):
+        self.nthreads = threads
+        self.ratelimit = threading.BoundedSemaphore(limit)
+        self.every = every
+        self.log = logging.getLogger(__name__).getChild(self.__class__.__name__).getChild(str(id(self)))
+
+    def _limited(func):
+        def _limited_wrapper(self, *args, **kwargs):
+            self.ratelimit.acquire()
+            t = threading.Timer(self.every, self.ratelimit.release)
+            t.start()
+            return func(self, *args, **kwargs)
+        return _limited_wrapper
+
+    @_limited
+    def _analyze_sentiment(
+        self,
+        text,
+        text_id=None,
+        doctype=language.enums.Document.Type.PLAIN_TEXT,
+        encoding=language.enums.EncodingType.UTF8,
+        doc_language='en'
+    ):
+        client = language.LanguageServiceClient()
+        document = {
+            "content": text,
+            "type": doctype,
+            "language": doc_language,
+        }
+        sent = client.analyze_sentiment(
+            document,
+            encoding_type=encoding
+        )
+        # Must do this to clean up connections and
+        # avoid "Too Many Open Files" error
+        # https://github.com/googleapis/google-cloud-python/issues/5523
+        client.transport.channel.close()
+        instrument.count('google.requests')
+        return (text_id, sent)
+
+    def analyze_sentiment(self, docs):
+        with multiprocessing.dummy.Pool(self.nthreads) as tpool:
+            results = tpool.starmap_async(self._analyze_sentiment, docs)
+            self.track_results(results)
+            return results.get()
+
+    def track_results(self, task, interval=60):
+        while task._number_left > 0:
+            self.log.info(
+                "Tasks remaining = %d",
+                (task._number_left * task._chunksize)
+            )
+            time.sleep(interval)
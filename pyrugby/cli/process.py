@@ -0,0 +1,210 @@
+import json
+import time
+import logging
+import pathlib
+import multiprocessing
+
+from tqdm import tqdm
+import pandas as pd
+
+import pyrugby.reddit
+from .. import instrument
+from ..reddit import storage, tokens
+
+log = logging.getLogger(__name__)
+
+# Initialise the tqdm pandas instance
+tqdm.pandas()
+
+
+def get_vader_sentiment(comment, analyzer):
+    vs = analyzer.polarity_scores(comment)
+    return vs
+
+
+def get_profanity_map(words, custom_profanities=None):
+    from profanity_filter import ProfanityFilter
+
+    pf = ProfanityFilter()
+    if custom_profanities is not None:
+        pf.custom_profane_word_dictionaries = {
+            'en': custom_profanities
+        }
+    profane = {}
+    for w in words:
+        cw = pf.censor_word(w)
+        if cw.is_profane:
+            profane[w] = cw.original_profane_word
+    return profane
+
+
+_analyzer = None
+
+
+def _init_vader():
+    global _analyzer
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    _analyzer = SentimentIntensityAnalyzer()
+
+
+def _vader_chunk(view, start, stop):
+    scores = view.output('vader_score')
+    for i, body in enumerate(view.values('body', start, stop), start):
+        if body is not None:
+            scores[i] = get_vader_sentiment(body, _analyzer)['compound']
+
+
+def _vader_scores(bodies):
+    return [
+        float('nan') if not isinstance(body, str)
+        else get_vader_sentiment(body, _analyzer)['compound']
+        for body in bodies
+    ]
+
+
+def add_vader_sentiment(df, processes=None):
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    log.info("Calculating VADER comment sentiment")
+    if processes and processes > 1:
+        # Only imported here as numpy and pyarrow are slow to import
+        from ..reddit import shm
+    if processes and processes > 1 and shm.AVAILABLE:
+        with shm.SharedFrame.from_frame(df, ['body']) as shared:
+            shared.add_output('vader_score', 'float64', fill=float('nan'))
+            shared.map(_vader_chunk, processes, initializer=_init_vader)
+            df['vader_score'] = shared.result('vader_score')
+        return
+    if processes and processes > 1:
+        # Without pyarrow each chunk of comments is pickled to the workers
+        chunksize = 2000
+        bodies = df.body.tolist()
+        with multiprocessing.Pool(processes, initializer=_init_vader) as pool:
+            df['vader_score'] = [
+                score for chunk in pool.imap(_vader_scores, [
+                    bodies[i:i + chunksize]
+                    for i in range(0, len(bodies), chunksize)
+                ])
+                for score in chunk
+            ]
+        return
+    vader = SentimentIntensityAnalyzer()
+    df['vader_score'] = df.body.progress_apply(
+        get_vader_sentiment, analyzer=vader
+    ).apply(
+        lambda x: x['compound']
+    )
+
+
+def add_google_sentiment(df):
+    from .google import GoogleNaturalLanguageBatch
+
+    log.info("Fetching Google NLP sentiment")
+    start = time.time()
+    google_nlp = GoogleNaturalLanguageBatch()
+    google_scores = google_nlp.analyze_sentiment(
+        list(zip(df.plaintext, df.id))
+    )
+    end = time.time()
+    log.info("All scores fetched in %d seconds", end-start)
+    google_df = pd.DataFrame(google_scores, columns=('id', 'sent'))
+    google_df.set_index('id', inplace=True)
+    df.drop(
+        columns=('google_score', 'google_magnitude'),
+        errors='ignore', inplace=True
+    )
+    df = df.join(google_df.sent.apply(
+        lambda x: pd.Series(
+            (x.document_sentiment.score, x.document_sentiment.magnitude),
+            index=('google_score', 'google_magnitude')
+        )
+    ))
+
+
+def add_profanities(df, profanity_json=None, processes=None):
+    # Set up the custom profanity dicts if needed
+    custom_profanities = None
+    profane_word_roots = {}
+    if profanity_json is not None:
+        with open(profanity_json, 'r') as pjson:
+            _custom_profanities = json.load(pjson)
+        custom_profanities = {
+            w for sublist
+            in _custom_profanities.values()
+            for w in sublist
+        }
+        profane_word_roots = {
+            w: root for root, words
+            in _custom_profanities.items()
+            for w in words
+        }
+    log.info("Tokenizing comments")
+    # Every word goes to the filter, which can match variants of the custom
+    # profanities that an exact vocabulary lookup would miss
+    with instrument.timer('reddit.tokenize'):
+        counts, candidates = tokens.token_stats_batch(
+            df.plaintext, processes=processes
+        )
+    df['words'] = counts
+    log.info("Detecting swear words")
+    # Each distinct word only needs checking once
+    profane = get_profanity_map(
+        set().union(*candidates), custom_profanities=custom_profanities
+    )
+    df['swears'] = [
+        [profane[w] for w in words if w in profane] for words in candidates
+    ]
+    del candidates
+    log.info("Calculating swear word roots")
+    df['swears_root'] = df.swears.progress_apply(
+        lambda x: [profane_word_roots.get(word, word) for word in x]
+    )
+
+
+def add_flair_info(df, flairs=None):
+    if flairs is None:
+        flairs = pyrugby.reddit.FlairRegistry()
+    # Unrecognised flairs are counted by the registry and reported once
+    info = flairs.lookup(df.flair_id)
+    for field in ('country', 'league', 'club'):
+        df[f'flair_{field}'] = [i[field] for i in info]
+
+
+PROCESS_FUNCMAP = {
+    'google': add_google_sentiment,
+    'vader': add_vader_sentiment,
+    'profanity': add_profanities,
+    'flair': add_flair_info
+}
+
+
+def main(args):
+    if 'profanity' in args.update and not args.profanities:
+        print(
+            'No profanities supplied falling back to'
+            ' "profanity_filter" defaults'
+        )
+    infile = pathlib.Path(args.input)
+    infmt = storage.comments_format(infile)
+    with instrument.timer('storage.read'):
+        df = storage.read_comments(infile, infmt)
+    for field in args.update:
+        with instrument.timer(f'process.{field}'):
+            if field == 'profanity':
+                PROCESS_FUNCMAP[field](df, args.profanities, args.processes)
+            elif field == 'vader':
+                PROCESS_FUNCMAP[field](df, args.processes)
+            elif field == 'flair':
+                PROCESS_FUNCMAP[field](df, args.flairs)
+            else:
+                PROCESS_FUNCMAP[field](df)
+    outfmt = args.format or infmt
+    with instrument.timer('storage.write'):
+        storage.write_comments(
+            df,
+            storage.comments_path(
+                infile.parent, f'{infile.stem}_{"_".join(args.update)}',
+                outfmt
+            ),
+            outfmt
+        )
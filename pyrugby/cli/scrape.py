@@ -0,0 +1,236 @@
+import logging
+import time
+import multiprocessing.dummy
+
+import pandas as pd
+import praw
+
+import pyrugby.reddit
+from .. import instrument
+from ..reddit import storage
+
+log = logging.getLogger(__name__)
+
+
+def get_reddit():
+    log.info("Creating Reddit instance")
+    # Settings for this 'bot' in praw.ini
+    return praw.Reddit("rugby-union-comment-scraper")
+
+
+def fetch_pushshift_comments(sub_id, after=None, flairs=None):
+    # Get all comments for submission from Pushshift
+    log.info("Fetching comments from Pushshift: %s", sub_id)
+    start = time.time()
+    pushshift_comms = pyrugby.reddit.get_all_pushshift_comments(
+        sub_id, after=after
+    )
+    end = time.time()
+    log.info(
+        "Pushshift: Fetched %d comments in %d seconds",
+        len(pushshift_comms), end-start
+    )
+    log.info("Processing Pushshift comment flair")
+    if flairs is None:
+        flairs = pyrugby.reddit.FlairRegistry()
+    with instrument.timer('reddit.flair'):
+        # Unrecognised flairs are counted by the registry and reported once
+        flairs.tag(pushshift_comms)
+    return pushshift_comms
+
+
+def fetch_praw_comments(submission, known_task=None, **expand_kwargs):
+    log.info("Fetching PRAW comments - approx %d", submission.num_comments)
+    known_ids = None
+    if known_task is not None:
+        # Wait for Pushshift so comments it already has can be skipped
+        known_ids = {c['id'] for c in known_task.get()}
+    expanded = pyrugby.reddit.expand_comments(
+        submission, known_ids=known_ids, **expand_kwargs
+    )
+    log.info(
+        "PRAW Fetched %d comments in %d seconds using %d requests",
+        len(expanded.comments), expanded.seconds, expanded.requests
+    )
+    if not expanded.complete:
+        log.warning(
+            "PRAW expansion stopped with %d comments unexpanded",
+            len(expanded.unexpanded)
+        )
+
+    praw_comms = []
+    log.info("Processing PRAW comments")
+    for comment in expanded.comments:
+        p_cmnt = pyrugby.reddit.praw_comment_to_dict(comment)
+        praw_comms.append(p_cmnt)
+    return praw_comms
+
+
+def scrape_and_clean(
+    subid, url=False, outdir='', fmt='csv', reddit=None,
+    skip_known=False, expand_kwargs=None, update=False, flairs=None
+):
+    sub_id = subid
+
+    if reddit is None:
+        reddit = get_reddit()
+
+    if url:
+        log.info("Fetching PRAW submission by url: %s", sub_id)
+        submission = reddit.submission(url=sub_id)
+        sub_id = submission.id
+        log.info("Submission ID determined as: %s", sub_id)
+    else:
+        log.info("Fetching PRAW submission by id: %s", sub_id)
+        submission = reddit.submission(sub_id)
+
+    outname = storage.comments_path(outdir, f"{sub_id}_cleaned", fmt)
+    if update and outname.exists():
+        return update_scraped(sub_id, outname, fmt, flairs)
+
+    # Pushshift and PRAW are independent so fetch them side by side
+    with multiprocessing.dummy.Pool(2) as tpool:
+        pushshift_task = tpool.apply_async(
+            fetch_pushshift_comments, (sub_id, None, flairs)
+        )
+        praw_task = tpool.apply_async(
+            fetch_praw_comments,
+            (submission, pushshift_task if skip_known else None),
+            expand_kwargs or {}
+        )
+        pushshift_comms = pushshift_task.get()
+        praw_comms = praw_task.get()
+
+    log.info("Merging comment sets")
+    merged, report = pyrugby.reddit.merge_comments(
+        pushshift_comms, praw_comms
+    )
+    del pushshift_comms, praw_comms
+    log.info(
+        "Merged %d comments | %d Pushshift only | %d PRAW only",
+        report.total, len(report.pushshift_only), len(report.praw_only)
+    )
+    all_comms = pd.DataFrame(merged).set_index('id')
+    del merged
+    add_plaintext(all_comms)
+
+    with instrument.timer('storage.write'):
+        storage.write_comments(all_comms, outname, fmt)
+    return outname
+
+
+def add_plaintext(df):
+    # Get plaintext comment using pushshift comment body
+    log.info("Converting comment to plaintext")
+    with instrument.timer('reddit.plaintext'):
+        df['plaintext'] = df.body.apply(
+            pyrugby.reddit.comment_md_to_plaintext
+        )
+
+
+def update_scraped(sub_id, outname, fmt='csv', flairs=None):
+    with instrument.timer('storage.read'):
+        stored = storage.read_comments(
+            outname, fmt, columns=['id', 'created_utc']
+        )
+    newest = stored.created_utc.max()
+    if pd.isna(newest):
+        newest = None
+    else:
+        # `after` is exclusive, so step back a second to catch comments
+        # created in the same second as the newest stored one
+        newest = int(newest) - 1
+    log.info(
+        "Updating %s with comments created after %s", outname, newest
+    )
+    new_comms = fetch_pushshift_comments(
+        sub_id, after=newest, flairs=flairs
+    )
+    # Keep stored rows, which may also carry PRAW fields
+    known = set(stored.id.dropna())
+    new_comms = [c for c in new_comms if c['id'] not in known]
+    if not new_comms:
+        log.info("No new comments for %s", sub_id)
+        return outname
+
+    merged, _ = pyrugby.reddit.merge_comments(new_comms, [])
+    new_df = pd.DataFrame(merged).set_index('id')
+    del merged
+    add_plaintext(new_df)
+
+    log.info(
+        "Appending %d new comments to %d stored", len(new_df), len(stored)
+    )
+    if fmt == 'csv':
+        with instrument.timer('storage.write'):
+            storage.append_comments(new_df, outname)
+        return outname
+
+    with instrument.timer('storage.read'):
+        existing = storage.read_comments(outname, fmt).set_index('id')
+    all_comms = pd.concat([existing, new_df])
+    with instrument.timer('storage.write'):
+        storage.write_comments(all_comms, outname, fmt)
+    return outname
+
+
+def read_submission_list(listfile):
+    subs = []
+    with open(listfile, 'r') as lfile:
+        for line in lfile:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                subs.append((line, line.startswith(('http://', 'https://'))))
+    return subs
+
+
+def batch_scrape(
+    listfile, outdir='', fmt='csv', workers=4,
+    skip_known=False, expand_kwargs=None, update=False, flairs=None
+):
+    subs = read_submission_list(listfile)
+    log.info("Batch scraping %d submissions with %d workers",
+             len(subs), workers)
+    # A single authenticated session is shared by every worker
+    reddit = get_reddit()
+
+    def _scrape(sub):
+        subid, url = sub
+        try:
+            return subid, scrape_and_clean(
+                subid, url, outdir, fmt, reddit, skip_known, expand_kwargs,
+                update, flairs
+            )
+        except Exception:
+            log.exception("Failed to scrape submission: %s", subid)
+            return subid, None
+
+    with multiprocessing.dummy.Pool(workers) as tpool:
+        results = tpool.map(_scrape, subs, chunksize=1)
+    failed = [subid for subid, outname in results if outname is None]
+    log.info(
+        "Batch complete: %d scraped, %d failed",
+        len(results) - len(failed), len(failed)
+    )
+    for subid in failed:
+        log.warning("Failed: %s", subid)
+    return results
+
+
+def main(args):
+    expand_kwargs = {
+        'workers': args.expand_workers,
+        'max_requests': args.max_requests,
+        'time_budget': args.time_budget,
+    }
+    if args.batch:
+        batch_scrape(
+            args.subid, args.outdir, args.format, args.workers,
+            args.skip_known, expand_kwargs, args.update, args.flairs
+        )
+    else:
+        scrape_and_clean(
+            args.subid, args.url, args.outdir, args.format,
+            skip_known=args.skip_known, expand_kwargs=expand_kwargs,
+            update=args.update, flairs=args.flairs
+        )
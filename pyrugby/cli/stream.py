@@ -0,0 +1,100 @@
+import json
+import asyncio
+import logging
+import threading
+
+from ..reddit.stream import (
+    CommentStream, CommentProcessor, RollingWindow,
+    praw_comment_source, pushshift_poll_source
+)
+
+log = logging.getLogger(__name__)
+
+
+def get_profane(profanity_json=None):
+    if profanity_json is not None:
+        with open(profanity_json, 'r') as pjson:
+            custom_profanities = json.load(pjson)
+        vocabulary = {
+            w.lower() for words in custom_profanities.values() for w in words
+        }
+        return lambda word: word if word in vocabulary else None
+
+    from profanity_filter import ProfanityFilter
+    pf = ProfanityFilter()
+
+    def _profane(word):
+        cw = pf.censor_word(word)
+        return cw.original_profane_word if cw.is_profane else None
+    return _profane
+
+
+def get_source(args, stop_event):
+    if args.source == 'pushshift':
+        sub_id = args.subid
+        if args.url:
+            from praw.models import Submission
+            sub_id = Submission.id_from_url(sub_id)
+        log.info("Polling Pushshift for submission: %s", sub_id)
+        return pushshift_poll_source(
+            sub_id, interval=args.interval, base_url=args.pushshift_url,
+            stop_event=stop_event
+        )
+
+    from .scrape import get_reddit
+    reddit = get_reddit()
+    if args.url:
+        submission = reddit.submission(url=args.subid)
+    else:
+        submission = reddit.submission(args.subid)
+    log.info("Streaming PRAW comments for submission: %s", submission.id)
+    return praw_comment_source(
+        submission, stop_event=stop_event, interval=args.interval
+    )
+
+
+def main(args):
+    analyzer = None
+    if not args.no_vader:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        analyzer = SentimentIntensityAnalyzer()
+    profane = None if args.no_profanity else get_profane(args.profanities)
+    process = CommentProcessor(analyzer, profane, args.flairs)
+
+    stop_event = threading.Event()
+    stream = CommentStream(
+        get_source(args, stop_event), process,
+        window=RollingWindow(args.window), workers=args.workers,
+        queue_size=args.queue_size, stop_event=stop_event
+    )
+    output = open(args.output, 'a') if args.output else None
+
+    def _report(stream):
+        summary = stream.window.summary()
+        if not summary:
+            return
+        latest = summary[-1]
+        log.info(
+            "Minute %d | %d comments | sentiment %s | %d swears | "
+            "p95 latency %.3fs",
+            latest['minute'], latest['comments'],
+            'n/a' if latest['sentiment_mean'] is None
+            else f"{latest['sentiment_mean']:.3f}",
+            latest['swears'], stream.latency_percentile(95) or 0
+        )
+        if output is not None:
+            output.write(json.dumps(summary) + '\n')
+            output.flush()
+
+    try:
+        asyncio.run(stream.run(
+            report_every=args.report_every, on_report=_report,
+            duration=args.duration
+        ))
+    except KeyboardInterrupt:
+        log.info("Stopping stream")
+        stop_event.set()
+    finally:
+        _report(stream)
+        if output is not None:
+            output.close()
@@ -0,0 +1,169 @@
+import json
+import time
+import logging
+import threading
+import collections
+from concurrent.futures import Future
+
+from .. import instrument
+from .models import Timeline
+
+log = logging.getLogger(__name__)
+
+# Seconds a cached timeline stays fresh, by match status (see
+# constants.EVENT_TYPES). None never expires. Completed matches only change
+# through occasional corrections, live ones change every few seconds
+STATUS_TTL = {
+    'C': None,
+    'U': 300,
+    'LD': 60,
+    'L': 15,
+    'L1': 15,
+    'L2': 15,
+    'LHT': 60,
+}
+DEFAULT_TTL = 60
+
+_Entry = collections.namedtuple('_Entry', 'timeline payload_bytes expires')
+
+
+def timeline_status(timeline):
+    return timeline.json.get('match', {}).get('status')
+
+
+def timeline_payload_bytes(timeline):
+    # The size of the fetched payload, or of its JSON when it wasn't fetched.
+    # The parsed events and any cached frame take several times this
+    if timeline.nbytes is not None:
+        return timeline.nbytes
+    return len(json.dumps(timeline.json))
+
+
+class TimelineCache():
+    # Shares parsed Timelines between callers in a long running process.
+    # Entries are evicted least recently used first once there are more than
+    # maxsize of them or their payloads total more than max_payload_bytes
+    # (a bound on fetched bytes, not on memory in use), and expire after
+    # the TTL for their match status. Concurrent requests for a match which
+    # isn't cached wait on a single fetch.
+    #
+    # Cached timelines are shared, so callers must not modify them; pass
+    # `prepare` (e.g. to infill timestamps) to do so once when loaded.
+    def __init__(
+        self, maxsize=128, max_payload_bytes=None, ttl=STATUS_TTL,
+        default_ttl=DEFAULT_TTL, loader=Timeline, prepare=None,
+        clock=time.monotonic
+    ):
+        self.maxsize = maxsize
+        self.max_payload_bytes = max_payload_bytes
+        self.ttl = ttl
+        self.default_ttl = default_ttl
+        self.loader = loader
+        self.prepare = prepare
+        self.clock = clock
+        self.payload_bytes = 0
+        self._entries = collections.OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, match_id):
+        with self._lock:
+            return self._fresh(match_id) is not None
+
+    def _fresh(self, match_id):
+        # Must hold the lock
+        entry = self._entries.get(match_id)
+        if entry is None:
+            return None
+        if entry.expires is not None and entry.expires <= self.clock():
+            self._remove(match_id)
+            instrument.count('cmsapi.cache_expired')
+            return None
+        return entry
+
+    def _remove(self, match_id):
+        entry = self._entries.pop(match_id)
+        self.payload_bytes -= entry.payload_bytes
+
+    def _load(self, match_id):
+        timeline = self.loader(match_id)
+        # Parse up front so the work is shared as well as the fetch
+        timeline.events
+        if self.prepare is not None:
+            self.prepare(timeline)
+        return timeline
+
+    def _store(self, match_id, timeline):
+        # Must hold the lock
+        ttl = self.ttl.get(timeline_status(timeline), self.default_ttl)
+        entry = _Entry(
+            timeline, timeline_payload_bytes(timeline),
+            None if ttl is None else self.clock() + ttl
+        )
+        if match_id in self._entries:
+            self._remove(match_id)
+        self._entries[match_id] = entry
+        self.payload_bytes += entry.payload_bytes
+        while self._entries and (
+            len(self._entries) > self.maxsize
+            or (
+                self.max_payload_bytes is not None
+                and self.payload_bytes > self.max_payload_bytes
+            )
+        ):
+            evicted, old = self._entries.popitem(last=False)
+            self.payload_bytes -= old.payload_bytes
+            instrument.count('cmsapi.cache_evictions')
+            log.debug('Evicted timeline %s', evicted)
+
+    def get(self, match_id):
+        with self._lock:
+            entry = self._fresh(match_id)
+            if entry is not None:
+                self._entries.move_to_end(match_id)
+                instrument.count('cmsapi.cache_hits')
+                return entry.timeline
+            future = self._pending.get(match_id)
+            owner = future is None
+            if owner:
+                future = self._pending[match_id] = Future()
+                instrument.count('cmsapi.cache_misses')
+            else:
+                instrument.count('cmsapi.cache_waits')
+        if not owner:
+            return future.result()
+        try:
+            timeline = self._load(match_id)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[match_id]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._store(match_id, timeline)
+            del self._pending[match_id]
+        future.set_result(timeline)
+        return timeline
+
+    def invalidate(self, match_id):
+        with self._lock:
+            if match_id in self._entries:
+                self._remove(match_id)
+                return True
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.payload_bytes = 0
+
+
+# A process wide cache for callers which don't need their own
+TIMELINES = TimelineCache()
+
+
+def get_timeline(match_id):
+    return TIMELINES.get(match_id)
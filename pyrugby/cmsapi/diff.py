@@ -0,0 +1,357 @@
+import os
+import json
+import logging
+import hashlib
+import pathlib
+import tempfile
+import threading
+import collections
+import multiprocessing.dummy
+from argparse import ArgumentParser
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .. import instrument
+
+log = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+# Top level keys which are diffed field by field; any others are replaced
+DIFFED_KEYS = ('match', 'timeline')
+
+
+def canonical_json(obj):
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+
+
+def content_hash(obj):
+    return hashlib.sha1(canonical_json(obj).encode('utf-8')).hexdigest()
+
+
+def event_key(event):
+    # Events have no stable id, so identify them by what happened and when
+    if 'id' in event:
+        return (event['id'],)
+    return (
+        event.get('type'),
+        event.get('time', {}).get('secs'),
+        event.get('teamIndex'),
+    )
+
+
+def keyed_events(events):
+    # Repeated keys (e.g. two subs in the same second) get an occurrence
+    # number so every event is addressable
+    seen = collections.Counter()
+    keyed = {}
+    for event in events:
+        key = event_key(event)
+        keyed[(*key, seen[key])] = event
+        seen[key] += 1
+    return keyed
+
+
+def _flatten(obj, prefix=''):
+    if isinstance(obj, dict):
+        flat = {}
+        for k, v in obj.items():
+            flat.update(_flatten(v, f'{prefix}{k}.'))
+        return flat
+    return {prefix[:-1]: obj}
+
+
+def field_changes(old, new):
+    old, new = _flatten(old), _flatten(new)
+    return {
+        k: (old.get(k), new.get(k))
+        for k in old.keys() | new.keys()
+        if old.get(k) != new.get(k)
+    }
+
+
+@dataclass
+class TimelineDiff():
+    match_id: Any = None
+    old_hash: Optional[str] = None
+    new_hash: Optional[str] = None
+    # (index in the new timeline, event)
+    added: List[Tuple[int, dict]] = field(default_factory=list)
+    removed: List[tuple] = field(default_factory=list)
+    # (event key, {field: (old, new)}, new event)
+    changed: List[Tuple[tuple, dict, dict]] = field(default_factory=list)
+    match_changes: Dict[str, tuple] = field(default_factory=dict)
+    new_match: Optional[dict] = None
+    # Other top level keys, with their new values, and any that were dropped
+    keys_changed: Dict[str, Any] = field(default_factory=dict)
+    keys_removed: List[str] = field(default_factory=list)
+    # Every event key in the new order, only set if events were reordered
+    order: Optional[List[tuple]] = None
+
+    @property
+    def empty(self):
+        return not (
+            self.added or self.removed or self.changed or self.match_changes
+            or self.keys_changed or self.keys_removed or self.order
+        )
+
+    def summary(self):
+        return {
+            'match_id': self.match_id,
+            'added': len(self.added),
+            'removed': len(self.removed),
+            'changed': len(self.changed),
+            'match_changes': sorted(self.match_changes),
+            'keys_changed': sorted(self.keys_changed),
+            'keys_removed': sorted(self.keys_removed),
+            'reordered': self.order is not None,
+        }
+
+    def to_json(self):
+        return {
+            'match_id': self.match_id,
+            'old_hash': self.old_hash,
+            'new_hash': self.new_hash,
+            'added': [{'index': i, 'event': e} for i, e in self.added],
+            'removed': [list(k) for k in self.removed],
+            'changed': [
+                {'key': list(k), 'fields': {
+                    f: list(v) for f, v in changes.items()
+                }}
+                for k, changes, _ in self.changed
+            ],
+            'match_changes': {
+                f: list(v) for f, v in self.match_changes.items()
+            },
+            'keys_changed': self.keys_changed,
+            'keys_removed': self.keys_removed,
+            'order': (
+                None if self.order is None else [list(k) for k in self.order]
+            ),
+        }
+
+
+def diff_timelines(old, new, match_id=None):
+    diff = TimelineDiff(
+        match_id=match_id, old_hash=content_hash(old),
+        new_hash=content_hash(new)
+    )
+    if diff.old_hash == diff.new_hash:
+        return diff
+    for key, value in new.items():
+        if key not in DIFFED_KEYS and (
+            key not in old or content_hash(old[key]) != content_hash(value)
+        ):
+            diff.keys_changed[key] = value
+    diff.keys_removed = [
+        key for key in old if key not in DIFFED_KEYS and key not in new
+    ]
+    old_match, new_match = old.get('match', {}), new.get('match', {})
+    if content_hash(old_match) != content_hash(new_match):
+        diff.match_changes = field_changes(old_match, new_match)
+        diff.new_match = new_match
+
+    old_events = keyed_events(old.get('timeline', []))
+    new_events = keyed_events(new.get('timeline', []))
+    for index, (key, event) in enumerate(new_events.items()):
+        old_event = old_events.get(key)
+        if old_event is None:
+            diff.added.append((index, event))
+        elif content_hash(old_event) != content_hash(event):
+            diff.changed.append((key, field_changes(old_event, event), event))
+    diff.removed = [key for key in old_events if key not in new_events]
+    kept = [key for key in old_events if key in new_events]
+    if kept != [key for key in new_events if key in old_events]:
+        diff.order = list(new_events)
+    return diff
+
+
+def apply_diff(data, diff):
+    # Updates `data` in place to match the new side of the diff
+    if diff.new_match is not None:
+        data['match'] = diff.new_match
+    data.update(diff.keys_changed)
+    for key in diff.keys_removed:
+        del data[key]
+    keyed = keyed_events(data.get('timeline', []))
+    for key in diff.removed:
+        keyed.pop(key)
+    for key, _, event in diff.changed:
+        keyed[key] = event
+    if diff.order is not None:
+        added = {key: event for key, (_, event) in zip(
+            [k for k in diff.order if k not in keyed], diff.added
+        )}
+        timeline = [
+            keyed[key] if key in keyed else added[key] for key in diff.order
+        ]
+    else:
+        timeline = list(keyed.values())
+        for index, event in sorted(diff.added, key=lambda a: a[0]):
+            timeline.insert(index, event)
+    data['timeline'] = timeline
+    return data
+
+
+def _write_json(path, obj):
+    # Write then rename so a failed write never leaves a partial file
+    path = pathlib.Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fjson:
+            json.dump(obj, fjson)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _read_json(path):
+    with open(path, 'r') as fjson:
+        return json.load(fjson)
+
+
+def fetch_timeline(match_id):
+    from .models import Timeline
+    return Timeline(match_id).json
+
+
+class TimelineArchive():
+    def __init__(self, path, fetch=fetch_timeline, create=True):
+        self.path = pathlib.Path(path)
+        if create:
+            self.path.mkdir(parents=True, exist_ok=True)
+        elif not self.path.is_dir():
+            raise FileNotFoundError(f'No timeline archive at {self.path}')
+        self.fetch = fetch
+        self._lock = threading.Lock()
+        manifest_path = self.path / MANIFEST_NAME
+        self.manifest = (
+            _read_json(manifest_path) if manifest_path.exists() else {}
+        )
+
+    def match_path(self, match_id):
+        return self.path / f'{match_id}.json'
+
+    def match_ids(self):
+        return [
+            p.stem for p in sorted(self.path.glob('*.json'))
+            if p.name != MANIFEST_NAME
+        ]
+
+    def load(self, match_id):
+        path = self.match_path(match_id)
+        return _read_json(path) if path.exists() else None
+
+    def stored_hash(self, match_id):
+        match_id = str(match_id)
+        if match_id not in self.manifest:
+            data = self.load(match_id)
+            if data is None:
+                return None
+            with self._lock:
+                self.manifest[match_id] = content_hash(data)
+        return self.manifest[match_id]
+
+    def save_manifest(self):
+        with self._lock:
+            _write_json(self.path / MANIFEST_NAME, self.manifest)
+
+    def update(self, match_id, new):
+        # The diff is only for logging and callers; the file is always
+        # rewritten whole, so the fetched timeline is stored as it is
+        new_hash = content_hash(new)
+        if new_hash == self.stored_hash(match_id):
+            instrument.count('archive.unchanged')
+            return None
+        old = self.load(match_id)
+        diff = diff_timelines(old or {}, new, match_id)
+        instrument.count('archive.added' if old is None else 'archive.changed')
+        _write_json(self.match_path(match_id), new)
+        with self._lock:
+            self.manifest[str(match_id)] = new_hash
+        log.info('Updated match %s: %s', match_id, diff.summary())
+        return diff
+
+    def refresh(self, match_id):
+        return self.update(match_id, self.fetch(match_id))
+
+    def refresh_all(self, match_ids=None, workers=4):
+        match_ids = self.match_ids() if match_ids is None else match_ids
+
+        def _refresh(match_id):
+            try:
+                return self.refresh(match_id)
+            except Exception:
+                log.exception('Failed to refresh match %s', match_id)
+                return None
+
+        try:
+            with multiprocessing.dummy.Pool(workers) as tpool:
+                diffs = tpool.map(_refresh, match_ids, chunksize=1)
+        finally:
+            self.save_manifest()
+        return [d for d in diffs if d is not None]
+
+    def compare(self, other):
+        diffs = []
+        for match_id in sorted(set(self.match_ids()) | set(other.match_ids())):
+            if self.stored_hash(match_id) == other.stored_hash(match_id):
+                continue
+            diffs.append(diff_timelines(
+                self.load(match_id) or {}, other.load(match_id) or {},
+                match_id
+            ))
+        return diffs
+
+
+def get_parser():
+    parser = ArgumentParser(
+        description='Compare and refresh archived cmsapi match timelines'
+    )
+    subparsers = parser.add_subparsers(
+        title='Sub-commands', dest='command'
+    )
+    differ = subparsers.add_parser(
+        'diff', help='Diff two timeline files or two archive directories'
+    )
+    differ.add_argument('old')
+    differ.add_argument('new')
+
+    refresher = subparsers.add_parser(
+        'refresh', help='Refetch archived timelines and store any changes'
+    )
+    refresher.add_argument('archive', help='Archive directory')
+    refresher.add_argument(
+        'match_ids', nargs='*',
+        help='Matches to refresh (Defaults to every archived match)'
+    )
+    refresher.add_argument(
+        '-w', '--workers', type=int, default=4,
+        help='Matches fetched at once (Defaults to 4)'
+    )
+    return parser
+
+
+def main(args):
+    if args.command == 'diff':
+        old, new = pathlib.Path(args.old), pathlib.Path(args.new)
+        if old.is_dir():
+            diffs = TimelineArchive(old, create=False).compare(
+                TimelineArchive(new, create=False)
+            )
+        else:
+            diffs = [diff_timelines(_read_json(old), _read_json(new))]
+        for diff in diffs:
+            if not diff.empty:
+                print(json.dumps(diff.to_json()))
+    elif args.command == 'refresh':
+        archive = TimelineArchive(args.archive)
+        diffs = archive.refresh_all(args.match_ids or None, args.workers)
+        log.info('%d matches changed', len(diffs))
+    else:
+        print('Unrecognised command!')
+
+
+def run(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    main(get_parser().parse_args(argv))
@@ -1,30 +1,43 @@
 from typing import List, Optional
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from functools import cached_property
+from operator import attrgetter
 
 import requests
 
-from .utils import get_api_url, cms_timestamp_to_datetime
+from .. import instrument
+from .utils import (
+    get_api_url, cms_timestamp_to_datetime, cms_timestamps_to_datetimes
+)
 
 log = logging.getLogger(__name__)
 
 
 class Timeline():
-    def __init__(self, match_id):
+    def __init__(self, match_id, data=None):
         self.match_id = match_id
-        self.json = self._get_data()
+        # Size of the fetched payload, None when data is passed in
+        self.nbytes = None
+        self.json = self._get_data() if data is None else data
         self.teams = {
             i: e['id'] for
             i, e in enumerate(self.json['match']['teams'])
         }
+        self._frame = None
+        self._event_times = {}
 
+    @instrument.timed('cmsapi.fetch')
     def _get_data(self):
         url = get_api_url('match_timeline', {'match_id': self.match_id})
         r = requests.get(url)
+        instrument.count('cmsapi.requests')
+        self.nbytes = len(r.content)
+        instrument.count('cmsapi.bytes', self.nbytes)
         data = r.json()
         return data
 
+    @instrument.timed('cmsapi.parse')
     def _parse_timeline(self):
         match_events = []
         for e in self.json['timeline']:
@@ -48,12 +61,37 @@ class Timeline():
                 gmt_offset=tstamp.get('gmtOffset', 0)
             )
             match_events.append(event)
+        instrument.count('cmsapi.events', len(match_events))
         return match_events
 
     @cached_property
     def events(self):
         return self._parse_timeline()
 
+    def _invalidate(self):
+        # Columnar views are rebuilt after events are modified
+        self._frame = None
+        self._event_times = {}
+
+    def to_frame(self):
+        if self._frame is None:
+            import pandas as pd
+            columns = [f.name for f in fields(MatchEvent)]
+            getter = attrgetter(*columns)
+            self._frame = pd.DataFrame.from_records(
+                [getter(e) for e in self.events], columns=columns
+            )
+        return self._frame
+
+    def event_times(self, local=True):
+        if local not in self._event_times:
+            self._event_times[local] = cms_timestamps_to_datetimes(
+                [e.millis for e in self.events],
+                [e.gmt_offset for e in self.events],
+                local=local
+            )
+        return self._event_times[local]
+
     def infill_timestamps(self):
         for i, e in enumerate(self.events):
             if e.millis is None:
@@ -62,7 +100,10 @@ class Timeline():
                 )
                 for e2 in self.events[:i][::-1]:
                     if e2.match_time and e2.millis:
-                        e.millis = e2.millis + (e.match_time - e2.match_time)
+                        # match_time is in seconds
+                        e.millis = e2.millis + 1000 * (
+                            e.match_time - e2.match_time
+                        )
                         e.gmt_offset = e2.gmt_offset
                         log.debug("New millis: %d", e.millis)
                         break
@@ -70,6 +111,7 @@ class Timeline():
                     log.warn(
                         "No suitable time correction found for: %s", e
                     )
+        self._invalidate()
 
     def calculate_scores(self):
         idmap = {v: k for k, v in self.teams.items()}
@@ -79,6 +121,7 @@ class Timeline():
                 score[idmap[e.team_id]] += e.points
             e.score0 = score[0]
             e.score1 = score[1]
+        self._invalidate()
 
 
 @dataclass
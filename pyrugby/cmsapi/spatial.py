@@ -0,0 +1,254 @@
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+POSITION_COLUMNS = ('x_pos', 'y_pos', 'ex_pos', 'ey_pos', 'm_pos')
+
+# Names given to territory zones, from a team's own try line outwards.
+# Positions are assumed to be normalised so each team attacks towards x=100
+TERRITORY_ZONES = ('own 22', 'own half', 'opposition half', 'opposition 22')
+TERRITORY_EDGES = (0, 22, 50, 78, 100)
+
+
+@dataclass(frozen=True)
+class PitchGrid():
+    x_bins: int = 10
+    y_bins: int = 7
+    x_range: tuple = (0, 100)
+    y_range: tuple = (0, 100)
+
+    @property
+    def shape(self):
+        return (self.x_bins, self.y_bins)
+
+    @property
+    def size(self):
+        return self.x_bins * self.y_bins
+
+    @property
+    def x_edges(self):
+        return np.linspace(*self.x_range, self.x_bins + 1)
+
+    @property
+    def y_edges(self):
+        return np.linspace(*self.y_range, self.y_bins + 1)
+
+    def cells(self, x, y):
+        # Flat cell index for each position, -1 where off the grid or missing
+        x = np.asarray(x, dtype='float64')
+        y = np.asarray(y, dtype='float64')
+        (x0, x1), (y0, y1) = self.x_range, self.y_range
+        xi = np.floor((x - x0) / (x1 - x0) * self.x_bins)
+        yi = np.floor((y - y0) / (y1 - y0) * self.y_bins)
+        # Positions on the far edge belong to the last cell
+        xi[x == x1] = self.x_bins - 1
+        yi[y == y1] = self.y_bins - 1
+        valid = (
+            (xi >= 0) & (xi < self.x_bins) & (yi >= 0) & (yi < self.y_bins)
+        )
+        cells = np.full(x.shape, -1, dtype='int64')
+        cells[valid] = (xi[valid] * self.y_bins + yi[valid]).astype('int64')
+        return cells
+
+
+def positions_frame(timelines, events=None):
+    frames = []
+    for timeline in timelines:
+        frame = timeline.to_frame()
+        if events is not None:
+            frame = frame[frame.event.isin(events)]
+        frame = frame[['event', 'team_id', 'player_id', *POSITION_COLUMNS]]
+        frames.append(frame.assign(match_id=timeline.match_id))
+    if not frames:
+        return pd.DataFrame(
+            columns=['match_id', 'event', 'team_id', 'player_id',
+                     *POSITION_COLUMNS]
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def _float_column(frame, col):
+    return pd.to_numeric(frame[col], errors='coerce').to_numpy(
+        dtype='float64', na_value=np.nan
+    )
+
+
+def _group_codes(frame, by):
+    if by is None:
+        return np.zeros(len(frame), dtype='int64'), [None]
+    codes, keys = pd.factorize(frame[by], use_na_sentinel=True)
+    return codes, list(keys)
+
+
+def heatmap(frame, grid=PitchGrid(), by='team_id', end=False):
+    x_col, y_col = ('ex_pos', 'ey_pos') if end else ('x_pos', 'y_pos')
+    cells = grid.cells(
+        _float_column(frame, x_col), _float_column(frame, y_col)
+    )
+    codes, keys = _group_codes(frame, by)
+    valid = (cells >= 0) & (codes >= 0)
+    counts = np.bincount(
+        codes[valid] * grid.size + cells[valid],
+        minlength=len(keys) * grid.size
+    ).reshape(len(keys), *grid.shape)
+    if by is None:
+        return counts[0]
+    return dict(zip(keys, counts))
+
+
+def vectors(frame, events=None):
+    if events is not None:
+        frame = frame[frame.event.isin(events)]
+    x, y = _float_column(frame, 'x_pos'), _float_column(frame, 'y_pos')
+    ex, ey = _float_column(frame, 'ex_pos'), _float_column(frame, 'ey_pos')
+    dx, dy = ex - x, ey - y
+    out = frame.assign(
+        dx=dx, dy=dy,
+        distance=np.hypot(dx, dy),
+        angle=np.degrees(np.arctan2(dy, dx))
+    )
+    return out[~np.isnan(out.distance.to_numpy())]
+
+
+def territory_zones(x, edges=TERRITORY_EDGES):
+    x = np.asarray(x, dtype='float64')
+    zones = np.searchsorted(edges[1:-1], x, side='right')
+    zones[np.isnan(x) | (x < edges[0]) | (x > edges[-1])] = -1
+    return zones
+
+
+def _territory_counts(frame, by, edges):
+    zones = territory_zones(_float_column(frame, 'x_pos'), edges)
+    codes, keys = _group_codes(frame, by)
+    valid = (zones >= 0) & (codes >= 0)
+    nzones = len(edges) - 1
+    counts = np.bincount(
+        codes[valid] * nzones + zones[valid], minlength=len(keys) * nzones
+    ).reshape(len(keys), nzones)
+    return counts, keys
+
+
+def territory(frame, by='team_id', edges=TERRITORY_EDGES):
+    counts, keys = _territory_counts(frame, by, edges)
+    return _territory_frame(counts, keys, len(edges) - 1, by)
+
+
+def _vector_sums(frame, by):
+    # Per group sums of dx, dy and distance, plus the vector count
+    vecs = vectors(frame)
+    codes, keys = _group_codes(vecs, by)
+    valid = codes >= 0
+    sums = [
+        np.bincount(
+            codes[valid], weights=vecs[col].to_numpy()[valid],
+            minlength=len(keys)
+        )
+        for col in ('dx', 'dy', 'distance')
+    ]
+    sums.append(np.bincount(codes[valid], minlength=len(keys)))
+    return dict(zip(keys, np.vstack(sums).T))
+
+
+def _territory_frame(counts, keys, nzones, by):
+    names = (
+        TERRITORY_ZONES if nzones == len(TERRITORY_ZONES)
+        else [f'zone {i}' for i in range(nzones)]
+    )
+    df = pd.DataFrame(counts, index=pd.Index(keys, name=by), columns=names)
+    totals = df.sum(axis=1).replace(0, np.nan)
+    return df.div(totals, axis=0).fillna(0.0)
+
+
+class SpatialAggregator():
+    def __init__(
+        self, grid=PitchGrid(), by='team_id', events=None,
+        edges=TERRITORY_EDGES
+    ):
+        self.grid = grid
+        self.by = by
+        self.events = events
+        self.edges = edges
+        self.matches = set()
+        self._start = {}
+        self._end = {}
+        self._territory = {}
+        self._vectors = {}
+
+    def _accumulate(self, store, new, shape):
+        for key, counts in new.items():
+            if key not in store:
+                store[key] = np.zeros(shape, dtype='int64')
+            store[key] += counts
+
+    def add_frame(self, frame, match_id=None):
+        if match_id is not None:
+            if match_id in self.matches:
+                log.debug('Match %s already aggregated; skipping', match_id)
+                return False
+            self.matches.add(match_id)
+        if self.events is not None:
+            frame = frame[frame.event.isin(self.events)]
+        by = self.by
+        for store, end in ((self._start, False), (self._end, True)):
+            counts = heatmap(frame, self.grid, by, end=end)
+            if by is None:
+                # Ungrouped heatmaps are a bare array
+                counts = {None: counts}
+            self._accumulate(store, counts, self.grid.shape)
+        counts, keys = _territory_counts(frame, by, self.edges)
+        self._accumulate(
+            self._territory, dict(zip(keys, counts)), len(self.edges) - 1
+        )
+        for key, vals in _vector_sums(frame, by).items():
+            self._vectors[key] = self._vectors.get(key, 0) + vals
+        return True
+
+    def add(self, timeline):
+        return self.add_frame(timeline.to_frame(), timeline.match_id)
+
+    def merge(self, other):
+        overlap = self.matches & other.matches
+        if overlap:
+            raise ValueError(
+                f'Aggregators share {len(overlap)} matches; cannot merge'
+            )
+        self.matches |= other.matches
+        self._accumulate(self._start, other._start, self.grid.shape)
+        self._accumulate(self._end, other._end, self.grid.shape)
+        self._accumulate(
+            self._territory, other._territory, len(self.edges) - 1
+        )
+        for key, vals in other._vectors.items():
+            self._vectors[key] = self._vectors.get(key, 0) + vals
+        return self
+
+    def heatmaps(self, end=False):
+        return dict(self._end if end else self._start)
+
+    def territory(self):
+        keys = list(self._territory)
+        nzones = len(self.edges) - 1
+        counts = (
+            np.vstack([self._territory[k] for k in keys]) if keys
+            else np.zeros((0, nzones), dtype='int64')
+        )
+        return _territory_frame(counts, keys, nzones, self.by)
+
+    def vector_summary(self):
+        rows = {
+            key: {
+                'mean_dx': vals[0] / vals[3],
+                'mean_dy': vals[1] / vals[3],
+                'mean_distance': vals[2] / vals[3],
+                'count': int(vals[3]),
+            }
+            for key, vals in self._vectors.items() if vals[3]
+        }
+        return pd.DataFrame.from_dict(rows, orient='index').rename_axis(
+            self.by
+        )
+
@@ -0,0 +1,276 @@
+import os
+import json
+import logging
+import pathlib
+import collections
+
+import numpy as np
+import pandas as pd
+
+from .. import instrument
+from .diff import content_hash
+
+log = logging.getLogger(__name__)
+
+# Stat columns and the timeline event types counted towards them
+STAT_EVENTS = {
+    'tries': ('T5', 'T4', 'PT5'),
+    'conversions': ('C2',),
+    'penalties': ('P3',),
+    'drop_goals': ('D3',),
+    'missed_conversions': ('Miss Con',),
+    'missed_penalties': ('Miss Pen',),
+    'missed_drop_goals': ('Miss DG',),
+    'yellow_cards': ('Yellow',),
+    'red_cards': ('Red',),
+}
+
+PLAYER_KEY = ['player_id', 'team_id']
+TEAM_KEY = ['team_id']
+PLAYER_COLUMNS = ['matches', 'points', *STAT_EVENTS, 'minutes']
+TEAM_COLUMNS = [
+    'matches', 'wins', 'draws', 'losses', 'points', 'points_against',
+    *STAT_EVENTS
+]
+
+
+def playing_minutes(frame, end=None):
+    # Minutes on the pitch from Sub On/Sub Off (and Red) events. Starters
+    # who play the whole match never appear in these, so any player with
+    # events but no substitution is assumed to have played the full match
+    times = pd.to_numeric(frame.match_time, errors='coerce')
+    if end is None:
+        end = times.max() if times.notna().any() else 0
+    on = {}
+    played = collections.defaultdict(float)
+    subbed = set()
+    for player, event, secs in zip(frame.player_id, frame.event, times):
+        if pd.isna(player) or event not in ('Sub On', 'Sub Off', 'Red'):
+            continue
+        secs = 0 if pd.isna(secs) else secs
+        if event == 'Sub On':
+            on[player] = secs
+        else:
+            played[player] += secs - on.pop(player, 0)
+        subbed.add(player)
+    for player, start in on.items():
+        played[player] += end - start
+    for player in frame.player_id.dropna().unique():
+        if player not in subbed:
+            played[player] = end
+    return {player: secs / 60 for player, secs in played.items()}
+
+
+def _stat_counts(frame, key):
+    counts = pd.DataFrame(
+        {col: frame.event.isin(types) for col, types in STAT_EVENTS.items()}
+    ).astype('int64')
+    counts['points'] = pd.to_numeric(
+        frame.points, errors='coerce'
+    ).fillna(0).astype('int64')
+    for col in key:
+        counts[col] = frame[col]
+    return counts.dropna(subset=key).groupby(key).sum()
+
+
+def player_contributions(timeline):
+    frame = timeline.to_frame()
+    stats = _stat_counts(frame, PLAYER_KEY)
+    stats['matches'] = 1
+    minutes = playing_minutes(frame)
+    stats['minutes'] = [
+        minutes.get(player, 0.0)
+        for player in stats.index.get_level_values('player_id')
+    ]
+    return stats[PLAYER_COLUMNS]
+
+
+def team_contributions(timeline):
+    frame = timeline.to_frame()
+    team_ids = list(timeline.teams.values())
+    stats = _stat_counts(frame, TEAM_KEY).reindex(
+        pd.Index(team_ids, name='team_id'), fill_value=0
+    )
+    stats['matches'] = 1
+    total = stats.points.sum()
+    stats['points_against'] = total - stats.points
+    diff = np.sign(stats.points - stats.points_against)
+    stats['wins'] = (diff > 0).astype('int64')
+    stats['draws'] = (diff == 0).astype('int64')
+    stats['losses'] = (diff < 0).astype('int64')
+    return stats[TEAM_COLUMNS]
+
+
+def _atomic_write(path, write):
+    tmp = path.with_name(path.name + '.tmp')
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _empty(key, columns):
+    return pd.DataFrame(
+        columns=columns, index=pd.MultiIndex.from_tuples([], names=key)
+        if len(key) > 1 else pd.Index([], name=key[0])
+    ).astype('float64')
+
+
+def _typed(df, columns):
+    counts = [c for c in columns if c != 'minutes']
+    return df.astype({c: 'int64' for c in counts})
+
+
+class StatsStore():
+    # Materialised per-player and per-team totals over a set of matches
+    # (e.g. a season), kept on disk alongside each match's contribution.
+    # Ingesting a match adds its contribution to the totals; re-ingesting a
+    # changed match swaps the old contribution for the new one, so totals
+    # never need recomputing from every timeline.
+    #
+    # Contribution files are named by the timeline's content hash and totals
+    # by a save generation, so nothing the manifest refers to is overwritten.
+    # Writing the manifest commits a save; until then the previous manifest
+    # and the files it names stay consistent, and unreferenced files are
+    # removed afterwards
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.match_dir = self.path / 'matches'
+        self.match_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.path / 'manifest.json'
+        self.generation = 0
+        self.manifest = {}
+        if manifest.exists():
+            with open(manifest, 'r') as fjson:
+                saved = json.load(fjson)
+            self.generation = saved['generation']
+            self.manifest = saved['matches']
+        self._players = self._read('players', PLAYER_KEY, PLAYER_COLUMNS)
+        self._teams = self._read('teams', TEAM_KEY, TEAM_COLUMNS)
+
+    def _totals_path(self, name, generation=None):
+        generation = self.generation if generation is None else generation
+        return self.path / f'{name}.{generation}.parquet'
+
+    def _read(self, name, key, columns):
+        path = self._totals_path(name)
+        if path.exists():
+            return pd.read_parquet(path).astype('float64')
+        return _empty(key, columns)
+
+    def _match_paths(self, match_id, digest):
+        return (
+            self.match_dir / f'{match_id}.{digest}.players.parquet',
+            self.match_dir / f'{match_id}.{digest}.teams.parquet',
+        )
+
+    def _contributions(self, match_id):
+        players, teams = self._match_paths(match_id, self.manifest[match_id])
+        return pd.read_parquet(players), pd.read_parquet(teams)
+
+    def _apply(self, players, teams, sign=1):
+        self._players = self._players.add(
+            sign * players.astype('float64'), fill_value=0
+        )
+        self._teams = self._teams.add(
+            sign * teams.astype('float64'), fill_value=0
+        )
+        if sign < 0:
+            self._players = self._players[self._players.matches > 0]
+            self._teams = self._teams[self._teams.matches > 0]
+
+    def ingest(self, timeline):
+        # Returns whether the totals changed. Changes are only stored by save
+        match_id = str(timeline.match_id)
+        digest = content_hash(timeline.json)
+        if self.manifest.get(match_id) == digest:
+            instrument.count('stats.unchanged')
+            return False
+        with instrument.timer('stats.ingest'):
+            players = player_contributions(timeline)
+            teams = team_contributions(timeline)
+            paths = self._match_paths(match_id, digest)
+            for df, path in zip((players, teams), paths):
+                _atomic_write(path, df.to_parquet)
+            if match_id in self.manifest:
+                log.info('Replacing stats for changed match %s', match_id)
+                self._apply(*self._contributions(match_id), sign=-1)
+            self._apply(players, teams)
+        self.manifest[match_id] = digest
+        instrument.count('stats.ingested')
+        return True
+
+    def ingest_all(self, timelines):
+        changed = 0
+        try:
+            for timeline in timelines:
+                changed += self.ingest(timeline)
+        finally:
+            self.save()
+        log.info('%d matches added or updated', changed)
+        return changed
+
+    def remove(self, match_id):
+        match_id = str(match_id)
+        if match_id not in self.manifest:
+            return False
+        self._apply(*self._contributions(match_id), sign=-1)
+        del self.manifest[match_id]
+        return True
+
+    def rebuild(self):
+        # Recompute the totals from the stored match contributions
+        players, teams = [], []
+        for match_id in self.manifest:
+            p, t = self._contributions(match_id)
+            players.append(p)
+            teams.append(t)
+        self._players = _empty(PLAYER_KEY, PLAYER_COLUMNS)
+        self._teams = _empty(TEAM_KEY, TEAM_COLUMNS)
+        if players:
+            self._apply(
+                pd.concat(players).groupby(PLAYER_KEY).sum(),
+                pd.concat(teams).groupby(TEAM_KEY).sum()
+            )
+
+    def save(self):
+        generation = self.generation + 1
+        _atomic_write(
+            self._totals_path('players', generation), self._players.to_parquet
+        )
+        _atomic_write(
+            self._totals_path('teams', generation), self._teams.to_parquet
+        )
+
+        def _dump(path):
+            with open(path, 'w') as fjson:
+                json.dump(
+                    {'generation': generation, 'matches': self.manifest},
+                    fjson
+                )
+        _atomic_write(self.path / 'manifest.json', _dump)
+        self.generation = generation
+        self._remove_unreferenced()
+
+    def _remove_unreferenced(self):
+        keep = {
+            path for match_id, digest in self.manifest.items()
+            for path in self._match_paths(match_id, digest)
+        }
+        keep.update(
+            self._totals_path(name) for name in ('players', 'teams')
+        )
+        for pattern, directory in (
+            ('*.parquet', self.match_dir), ('*.*.parquet', self.path)
+        ):
+            for path in directory.glob(pattern):
+                if path not in keep:
+                    path.unlink()
+
+    @property
+    def match_ids(self):
+        return list(self.manifest)
+
+    def players(self):
+        return _typed(self._players[PLAYER_COLUMNS], PLAYER_COLUMNS)
+
+    def teams(self):
+        return _typed(self._teams[TEAM_COLUMNS], TEAM_COLUMNS)
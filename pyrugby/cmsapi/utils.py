@@ -8,8 +8,31 @@ log = logging.getLogger(__name__)
 
 
 def cms_timestamp_to_datetime(timestamp, gmt_offset=0):
-    return datetime.datetime.utcfromtimestamp(
-        timestamp + gmt_offset*60*60
+    return datetime.datetime.fromtimestamp(
+        timestamp,
+        tz=datetime.timezone(datetime.timedelta(hours=gmt_offset or 0))
+    )
+
+
+def cms_timestamps_to_datetimes(millis, gmt_offsets=None, local=True):
+    import numpy as np
+    import pandas as pd
+
+    # None becomes NaN, and NaN becomes NaT
+    millis = np.asarray(millis, dtype='float64')
+    times = pd.to_datetime(millis, unit='ms', utc=True)
+    if not local or gmt_offsets is None:
+        return times
+    offsets = np.asarray(gmt_offsets, dtype='float64')[~np.isnan(millis)]
+    offsets = np.unique(np.nan_to_num(offsets))
+    if len(offsets) > 1:
+        log.warning(
+            'Multiple GMT offsets %s found; returning UTC times', offsets
+        )
+        return times
+    offset = offsets[0] if len(offsets) else 0
+    return times.tz_convert(
+        datetime.timezone(datetime.timedelta(hours=float(offset)))
     )
 
 
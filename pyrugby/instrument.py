@@ -0,0 +1,233 @@
+import io
+import logging
+import re
+import sys
+import time
+import threading
+import functools
+import collections
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+PROFILERS = ('cprofile', 'sampling')
+
+
+class _Timer():
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class SamplingProfiler():
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            frame = frames.get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_filename}:{code.co_name}:{frame.f_lineno}'
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def report(self, limit=20):
+        # Collapsed stacks, suitable for flamegraph tools
+        return '\n'.join(
+            f'{stack} {n}' for stack, n in self.samples.most_common(limit)
+        )
+
+
+class Metrics():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timers = collections.defaultdict(_Timer)
+        self.counters = collections.Counter()
+        self.profiles = {}
+        self.profiler = None
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+            self.profiles.clear()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.timers[stage].add(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            with self.profile(stage):
+                yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def timed(self, stage):
+        def _decorator(func):
+            @functools.wraps(func)
+            def _timed_wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return _timed_wrapper
+        return _decorator
+
+    def enable_profiling(self, kind='cprofile', interval=0.005):
+        if kind not in PROFILERS:
+            raise ValueError(f'Unrecognised profiler: {kind}')
+        self.profiler = (kind, interval)
+
+    def disable_profiling(self):
+        self.profiler = None
+
+    @contextmanager
+    def profile(self, stage):
+        # Stages nested inside a profiled stage are covered by its profile
+        if self.profiler is None or getattr(_local, 'profiling', False):
+            yield
+            return
+        kind, interval = self.profiler
+        if kind == 'cprofile':
+            import cProfile
+            prof = cProfile.Profile()
+        else:
+            prof = SamplingProfiler(interval)
+        try:
+            if kind == 'cprofile':
+                prof.enable()
+            else:
+                prof.start()
+        except ValueError:
+            # Only one cProfile may run at once on newer Pythons
+            log.debug('Profiler busy, not profiling stage: %s', stage)
+            yield
+            return
+        _local.profiling = True
+        try:
+            yield
+        finally:
+            if kind == 'cprofile':
+                prof.disable()
+            else:
+                prof.stop()
+            _local.profiling = False
+            with self._lock:
+                self.profiles.setdefault(stage, []).append(prof)
+
+    def profile_report(self, stage=None, limit=20):
+        out = io.StringIO()
+        for name, profs in self.profiles.items():
+            if stage is not None and name != stage:
+                continue
+            for prof in profs:
+                out.write(f'### {name}\n')
+                if isinstance(prof, SamplingProfiler):
+                    out.write(prof.report(limit))
+                    out.write('\n')
+                else:
+                    import pstats
+                    pstats.Stats(prof, stream=out).sort_stats(
+                        'cumulative'
+                    ).print_stats(limit)
+        return out.getvalue()
+
+    def summary(self):
+        with self._lock:
+            return {
+                'timers': {
+                    stage: {
+                        'count': t.count,
+                        'total': t.total,
+                        'mean': t.total / t.count if t.count else 0.0,
+                        'max': t.max,
+                    }
+                    for stage, t in self.timers.items()
+                },
+                'counters': dict(self.counters),
+            }
+
+    def to_prometheus(self, prefix='pyrugby'):
+        summary = self.summary()
+        lines = []
+        if summary['timers']:
+            name = f'{prefix}_stage_seconds'
+            lines.append(f'# TYPE {name} summary')
+            for stage, t in sorted(summary['timers'].items()):
+                label = f'stage="{_escape_label(stage)}"'
+                lines.append(f'{name}_count{{{label}}} {t["count"]}')
+                lines.append(f'{name}_sum{{{label}}} {t["total"]:.6f}')
+            name = f'{prefix}_stage_seconds_max'
+            lines.append(f'# TYPE {name} gauge')
+            for stage, t in sorted(summary['timers'].items()):
+                label = f'stage="{_escape_label(stage)}"'
+                lines.append(f'{name}{{{label}}} {t["max"]:.6f}')
+        for counter, value in sorted(summary['counters'].items()):
+            name = f'{prefix}_{_metric_name(counter)}_total'
+            lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def log_summary(self, level=logging.INFO):
+        summary = self.summary()
+        for stage, t in sorted(summary['timers'].items()):
+            log.log(
+                level, 'Stage %s | %d calls | %.3fs total | %.3fs max',
+                stage, t['count'], t['total'], t['max']
+            )
+        for counter, value in sorted(summary['counters'].items()):
+            log.log(level, 'Counter %s | %d', counter, value)
+
+
+_local = threading.local()
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _escape_label(value):
+    return value.replace('\\', r'\\').replace('"', r'\"')
+
+
+# Default process wide metrics used throughout pyrugby
+METRICS = Metrics()
+
+timer = METRICS.timer
+timed = METRICS.timed
+count = METRICS.count
@@ -0,0 +1,102 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# Timeline events comments are attributed to
+REACTION_EVENTS = ('T5', 'T4', 'PT5', 'P3', 'D3', 'Yellow', 'Red')
+
+
+def _event_seconds(timeline):
+    times = timeline.event_times(local=False)
+    secs = times.as_unit('ms').asi8 / 1000
+    secs[times.isna()] = np.nan
+    return secs
+
+
+def _swear_counts(swears):
+    if swears.dtype == object:
+        # List columns, as written by `add_profanities`
+        return swears.str.len().fillna(0).to_numpy(dtype='float64')
+    return pd.to_numeric(swears, errors='coerce').fillna(0).to_numpy()
+
+
+def attribute_comments(event_secs, comment_secs, window=300):
+    # Index of the latest event at or before each comment, -1 if there is
+    # none within the window. event_secs must be sorted
+    idx = np.searchsorted(event_secs, comment_secs, side='right') - 1
+    valid = idx >= 0
+    lag = np.full(len(comment_secs), np.inf)
+    lag[valid] = comment_secs[valid] - event_secs[idx[valid]]
+    idx[~(lag <= window)] = -1
+    return idx
+
+
+def event_reactions(
+    timeline, comments, events=REACTION_EVENTS, window=300,
+    time_col='created_utc', sentiment_col='vader_score', swears_col='swears'
+):
+    frame = timeline.to_frame()
+    secs = _event_seconds(timeline)
+    mask = np.ones(len(secs), dtype=bool)
+    if events is not None:
+        mask = frame.event.isin(events).to_numpy(dtype=bool)
+    missing = int(np.count_nonzero(mask & np.isnan(secs)))
+    mask = mask & ~np.isnan(secs)
+    if missing:
+        log.info(
+            '%d events have no timestamp; run infill_timestamps to use them',
+            missing
+        )
+    order = np.flatnonzero(mask)
+    order = order[np.argsort(secs[order], kind='stable')]
+    event_secs = secs[order]
+
+    comment_secs = pd.to_numeric(
+        comments[time_col], errors='coerce'
+    ).to_numpy(dtype='float64', na_value=np.nan)
+    idx = attribute_comments(event_secs, comment_secs, window)
+    attributed = idx >= 0
+    nevents = len(order)
+
+    counts = np.bincount(idx[attributed], minlength=nevents)
+    out = frame.iloc[order][
+        ['event', 'label', 'team_id', 'player_id', 'match_time']
+    ].copy()
+    out['time'] = timeline.event_times(local=False)[order]
+    out['comments'] = counts
+
+    # Comments are attributed until the next event or the window closes
+    span = np.clip(np.diff(event_secs, append=np.inf), 1, window)
+    out['window'] = span
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out['comments_per_min'] = counts / (span / 60)
+        valid_secs = comment_secs[~np.isnan(comment_secs)]
+        if len(valid_secs) > 1:
+            duration = valid_secs.max() - valid_secs.min()
+            base_rate = len(valid_secs) / (duration / 60) if duration else 0
+        else:
+            base_rate = 0
+        out['lift'] = (
+            out.comments_per_min / base_rate if base_rate else np.nan
+        )
+
+        if sentiment_col in comments.columns:
+            sentiment = pd.to_numeric(
+                comments[sentiment_col], errors='coerce'
+            ).to_numpy(dtype='float64', na_value=np.nan)
+            scored = attributed & ~np.isnan(sentiment)
+            out['sentiment_mean'] = np.bincount(
+                idx[scored], weights=sentiment[scored], minlength=nevents
+            ) / np.bincount(idx[scored], minlength=nevents)
+
+        if swears_col in comments.columns:
+            swears = _swear_counts(comments[swears_col])
+            out['swears'] = np.bincount(
+                idx[attributed], weights=swears[attributed],
+                minlength=nevents
+            ).astype('int64')
+            out['swears_per_comment'] = out.swears / counts
+    return out.reset_index(names='event_index')
@@ -5,11 +5,17 @@ from .utils import (
     get_all_pushshift_comments
 )
 from .constants import FLAIRS
+from .expand import expand_comments, ExpandResult
+from .merge import merge_comments, MergeReport
+from .flairs import FlairRegistry
 
 __all__ = [
     'constants',
     'praw_comment_to_dict',
     'get_flair_identifier', 'comment_md_to_plaintext',
     'get_all_pushshift_comments',
+    'expand_comments', 'ExpandResult',
+    'merge_comments', 'MergeReport',
+    'FlairRegistry',
     'FLAIRS'
 ]
@@ -0,0 +1,239 @@
+import logging
+import time
+import weakref
+import threading
+import multiprocessing.dummy
+from dataclasses import dataclass, field
+from typing import List
+
+from .. import instrument
+
+log = logging.getLogger(__name__)
+
+MORECHILDREN_PATH = 'api/morechildren/'
+# Reddit returns at most 100 children per morechildren request
+MORECHILDREN_LIMIT = 100
+# Reddit's OAuth quota, used until response headers say otherwise
+DEFAULT_RATE = 100
+DEFAULT_PERIOD = 60.0
+
+
+class RateLimiter():
+    # A token bucket shared by every thread making requests through one
+    # praw.Reddit. prawcore's own limiter assumes requests are sequential,
+    # so concurrent threads would all pass it at once and burst past the
+    # quota. The fill rate follows the x-ratelimit-* headers as they arrive
+    def __init__(
+        self, rate=DEFAULT_RATE, period=DEFAULT_PERIOD, clock=time.monotonic,
+        sleep=time.sleep
+    ):
+        self.capacity = rate
+        self.tokens = float(rate)
+        self.fill = rate / period
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.fill
+        )
+        self._updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.fill
+            instrument.count('praw.ratelimit_waits')
+            self.sleep(wait)
+
+    def update(self, remaining, reset_in):
+        # Spread the requests Reddit says are left over the rest of its window
+        if remaining is None or reset_in is None:
+            return
+        with self._lock:
+            self._refill()
+            reset_in = max(reset_in, 1.0)
+            self.tokens = min(self.tokens, max(remaining, 0))
+            self.fill = max(remaining, 1) / reset_in
+
+    def update_from(self, reddit):
+        # prawcore keeps the latest x-ratelimit-* header values
+        limits = getattr(
+            getattr(reddit, '_core', None), '_rate_limiter', None
+        )
+        remaining = getattr(limits, 'remaining', None)
+        reset = getattr(limits, 'reset_timestamp', None)
+        self.update(
+            remaining, None if reset is None else reset - time.time()
+        )
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_limiters = weakref.WeakKeyDictionary()
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(reddit):
+    # One limiter per Reddit instance, shared by everything using it
+    with _limiters_lock:
+        limiter = _limiters.get(reddit)
+        if limiter is None:
+            limiter = _limiters[reddit] = RateLimiter()
+        return limiter
+
+
+@dataclass
+class ExpandResult():
+    comments: List = field(default_factory=list)
+    # Hidden comment ids, or parent fullnames for "continue this thread"
+    unexpanded: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    requests: int = 0
+    seconds: float = 0.0
+
+    @property
+    def complete(self):
+        return not self.unexpanded
+
+
+def _chunks(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i+size]
+
+
+def _more_items(result):
+    # "Continue this thread" stubs hand back a CommentForest
+    return result.list() if hasattr(result, 'list') else result
+
+
+@instrument.timed('praw.expand')
+def expand_comments(
+    submission, known_ids=None, workers=4, batch_size=MORECHILDREN_LIMIT,
+    max_requests=None, time_budget=None, limiter=None
+):
+    from praw.models import MoreComments
+
+    reddit = submission._reddit
+    if limiter is None:
+        limiter = limiter_for(reddit)
+    known_ids = set(known_ids or ())
+    result = ExpandResult()
+    comments = {}
+    pending = {}
+    continues = []
+
+    def _collect(items):
+        for item in items:
+            if isinstance(item, MoreComments):
+                if item.children:
+                    pending.update(dict.fromkeys(item.children))
+                else:
+                    continues.append(item)
+            else:
+                comments[item.id] = item
+
+    def _fetch(ids):
+        # Sent as a POST like PRAW's MoreComments.comments, so prawcore
+        # adds api_type=json and the comments come back parsed
+        with limiter:
+            items = reddit.post(MORECHILDREN_PATH, data={
+                'children': ','.join(ids),
+                'link_id': submission.fullname,
+                'sort': submission.comment_sort,
+            })
+        limiter.update_from(reddit)
+        instrument.count('praw.requests')
+        instrument.count('praw.comments', len(items))
+        for item in items:
+            item.submission = submission
+        return items
+
+    def _continue(more):
+        with limiter:
+            items = _more_items(more.comments())
+        limiter.update_from(reddit)
+        instrument.count('praw.requests')
+        return items
+
+    def _budget_left():
+        if max_requests is not None and result.requests >= max_requests:
+            log.info('Request budget of %d exhausted', max_requests)
+            return False
+        if (
+            time_budget is not None
+            and time.monotonic() - start >= time_budget
+        ):
+            log.info('Time budget of %ds exhausted', time_budget)
+            return False
+        return True
+
+    start = time.monotonic()
+    with limiter:
+        # Fetches the submission's comment tree if not already loaded
+        top_level = submission.comments.list()
+    limiter.update_from(reddit)
+    _collect(top_level)
+    with multiprocessing.dummy.Pool(workers) as tpool:
+        while pending or continues:
+            todo = [i for i in pending if i not in comments]
+            pending.clear()
+            covered = [i for i in todo if i in known_ids]
+            result.skipped.extend(covered)
+            instrument.count('praw.skipped', len(covered))
+            todo = [i for i in todo if i not in known_ids]
+            if not todo and not continues:
+                if covered:
+                    log.info(
+                        'Remaining %d comments already known; stopping',
+                        len(covered)
+                    )
+                break
+            if not _budget_left():
+                result.unexpanded.extend(todo)
+                result.unexpanded.extend(
+                    more.parent_id for more in continues
+                )
+                break
+            # Keep each round to one request per worker so the budget
+            # is checked often
+            batches = list(_chunks(todo, batch_size))
+            if max_requests is not None:
+                nleft = max_requests - result.requests
+            else:
+                nleft = len(batches) + len(continues)
+            nround = min(workers, nleft)
+            round_batches = batches[:nround]
+            round_continues = continues[:nround - len(round_batches)]
+            del continues[:len(round_continues)]
+            for batch in batches[nround:]:
+                pending.update(dict.fromkeys(batch))
+
+            batch_task = tpool.map_async(_fetch, round_batches, chunksize=1)
+            continue_task = tpool.map_async(
+                _continue, round_continues, chunksize=1
+            )
+            fetched = batch_task.get() + continue_task.get()
+            result.requests += len(round_batches) + len(round_continues)
+            for items in fetched:
+                _collect(items)
+            log.info(
+                'Expanded %d comments using %d requests | %d pending',
+                len(comments), result.requests,
+                len(pending) + len(continues)
+            )
+    result.comments = list(comments.values())
+    result.seconds = time.monotonic() - start
+    return result
@@ -0,0 +1,149 @@
+import re
+import json
+import logging
+import threading
+import collections
+
+from .constants import FLAIRS
+from .utils import flair_id_from_template, get_flair_identifier
+
+log = logging.getLogger(__name__)
+
+NO_FLAIR = {'club': None, 'country': None, 'league': None}
+
+
+def _normalise(name):
+    # ':South-Africa:' / 'South Africa' -> 'south africa'
+    name = re.sub(r'[:_\-]+', ' ', name or '').lower()
+    name = re.sub(r'\bflag\b', ' ', name)
+    return ' '.join(name.split())
+
+
+def template_text(template):
+    parts = [
+        d.get('t', '') for d in template.get('richtext') or ()
+        if d.get('e') == 'text'
+    ]
+    return ' '.join(parts) or template.get('text') or ''
+
+
+def read_templates(path):
+    with open(path, 'r') as fjson:
+        templates = json.load(fjson)
+    if isinstance(templates, dict):
+        templates = templates.get('templates', [])
+    return templates
+
+
+def dump_templates(subreddit, path):
+    # subreddit: a praw Subreddit
+    templates = [dict(t) for t in subreddit.flair.templates]
+    with open(path, 'w') as fjson:
+        json.dump(templates, fjson, indent=2)
+    log.info('Wrote %d flair templates to %s', len(templates), path)
+    return len(templates)
+
+
+class FlairRegistry():
+    # A single flair lookup for a run: the hand maintained FLAIRS merged
+    # with any flair templates from a dump of the subreddit's templates.
+    # Template flairs missing from FLAIRS are classified by matching their
+    # text against known clubs, countries and leagues. Flairs still not
+    # found while identifying comments are counted and reported once
+    def __init__(self, flairs=FLAIRS):
+        self.flairs = dict(flairs)
+        self.unknown = collections.Counter()
+        self._lock = threading.Lock()
+        self._compile_names()
+
+    @classmethod
+    def load(cls, templates_path=None, flairs=FLAIRS):
+        registry = cls(flairs)
+        if templates_path is not None:
+            registry.load_templates(read_templates(templates_path))
+        return registry
+
+    def _compile_names(self):
+        self.names = {}
+        for field in ('league', 'country', 'club'):
+            # Later fields are more specific so take precedence
+            for info in self.flairs.values():
+                if info.get(field):
+                    name = _normalise(info[field])
+                    if field == 'club' or name not in self.names:
+                        self.names[name] = (
+                            dict(info) if field == 'club'
+                            else {**NO_FLAIR, field: info[field]}
+                        )
+
+    def classify(self, *names):
+        for name in names:
+            info = self.names.get(_normalise(name))
+            if info is not None:
+                return dict(info)
+        return dict(NO_FLAIR)
+
+    def load_templates(self, templates):
+        added = collections.Counter()
+        for template in templates:
+            fid = flair_id_from_template(template)
+            if not fid or fid in self.flairs:
+                continue
+            info = self.classify(template_text(template), fid)
+            self.flairs[fid] = info
+            added['classified' if any(info.values()) else 'unclassified'] += 1
+        log.info(
+            'Loaded %d new flairs from templates (%d classified)',
+            sum(added.values()), added['classified']
+        )
+        return sum(added.values())
+
+    def __contains__(self, fid):
+        return fid in self.flairs
+
+    def __len__(self):
+        return len(self.flairs)
+
+    def get(self, fid, default=None):
+        return self.flairs.get(fid, default)
+
+    def _record_unknown(self, fid, n=1):
+        with self._lock:
+            self.unknown[fid] += n
+
+    def identify(self, comment):
+        fid = get_flair_identifier(comment)
+        if fid not in self.flairs:
+            self._record_unknown(fid)
+        return fid
+
+    def lookup(self, flair_ids):
+        # Flair info for a column of stored flair ids, where missing ids may
+        # have been read back as NA rather than None. Each distinct id is
+        # looked up once and unrecognised ones are counted for the report
+        flair_ids = [
+            fid if isinstance(fid, str) else None for fid in flair_ids
+        ]
+        info = {}
+        for fid, n in collections.Counter(flair_ids).items():
+            info[fid] = self.flairs.get(fid)
+            if info[fid] is None:
+                self._record_unknown(fid, n)
+                info[fid] = NO_FLAIR
+        return [info[fid] for fid in flair_ids]
+
+    def tag(self, comments):
+        for comment in comments:
+            comment['flair_id'] = self.identify(comment)
+        return comments
+
+    def report(self, top=20):
+        if not self.unknown:
+            return
+        log.warning(
+            '%d comments had %d unrecognised flairs. Most common: %s',
+            sum(self.unknown.values()), len(self.unknown),
+            ', '.join(
+                f'{fid} ({n})' for fid, n in self.unknown.most_common(top)
+            )
+        )
@@ -0,0 +1,120 @@
+import logging
+from dataclasses import dataclass, field
+from typing import List
+
+from .. import instrument
+
+log = logging.getLogger(__name__)
+
+# Pushshift fields kept in the merged comment set
+PUSHSHIFT_COLUMNS = (
+    'author', 'author_flair_css_class', 'author_flair_text', 'flair_id',
+    'body', 'created_utc', 'score', 'parent_id', 'link_id',
+)
+
+# Fields produced by `praw_comment_to_dict`
+PRAW_COLUMNS = (
+    'author', 'controversiality', 'score_praw', 'score_hidden', 'depth',
+    'created_utc', 'markdown', 'html', 'removed_praw', 'praw',
+)
+
+# Pushshift fields which are filled from PRAW when Pushshift lacks them.
+# The PRAW value is then cleared, as `<field>_source` says where it came from
+COALESCE_COLUMNS = {
+    'body': 'markdown',
+    'author': 'author_praw',
+    'created_utc': 'created_utc_praw',
+}
+
+
+@dataclass
+class MergeReport():
+    pushshift_only: List[str] = field(default_factory=list)
+    praw_only: List[str] = field(default_factory=list)
+    both: int = 0
+    duplicates: int = 0
+
+    @property
+    def total(self):
+        return len(self.pushshift_only) + len(self.praw_only) + self.both
+
+
+@instrument.timed('reddit.merge')
+def merge_comments(
+    pushshift_comms, praw_comms,
+    pushshift_columns=PUSHSHIFT_COLUMNS, praw_columns=PRAW_COLUMNS,
+    id_col='id'
+):
+    report = MergeReport()
+    rows = {}
+    data = {id_col: []}
+    data.update((c, []) for c in pushshift_columns)
+    sources = []
+
+    for comm in pushshift_comms:
+        cid = comm[id_col]
+        if cid in rows:
+            report.duplicates += 1
+            continue
+        rows[cid] = len(sources)
+        data[id_col].append(cid)
+        for col in pushshift_columns:
+            data[col].append(comm.get(col))
+        sources.append('pushshift')
+
+    npush = len(sources)
+    # Clashing PRAW fields get a suffix, as with a DataFrame join
+    praw_names = {
+        col: f'{col}_praw' if col in data else col for col in praw_columns
+    }
+    for name in praw_names.values():
+        data[name] = [None] * npush
+
+    for comm in praw_comms:
+        cid = comm[id_col]
+        row = rows.get(cid)
+        if row is None:
+            rows[cid] = row = len(sources)
+            data[id_col].append(cid)
+            for col in pushshift_columns:
+                data[col].append(None)
+            for name in praw_names.values():
+                data[name].append(None)
+            sources.append('praw')
+        elif sources[row] == 'both' or row >= npush:
+            report.duplicates += 1
+            continue
+        else:
+            sources[row] = 'both'
+        for col, name in praw_names.items():
+            data[name][row] = comm.get(col)
+
+    for col, fallback in COALESCE_COLUMNS.items():
+        if col not in data or fallback not in data:
+            continue
+        values, fallbacks = data[col], data[fallback]
+        col_sources = []
+        for i, val in enumerate(values):
+            if val is not None:
+                col_sources.append('pushshift')
+            elif fallbacks[i] is not None:
+                values[i], fallbacks[i] = fallbacks[i], None
+                col_sources.append('praw')
+            else:
+                col_sources.append(None)
+        data[f'{col}_source'] = col_sources
+    data['source'] = sources
+
+    for cid, src in zip(data[id_col], sources):
+        if src == 'pushshift':
+            report.pushshift_only.append(cid)
+        elif src == 'praw':
+            report.praw_only.append(cid)
+        else:
+            report.both += 1
+    log.debug(
+        'Merged %d comments | both: %d | pushshift only: %d | praw only: %d',
+        report.total, report.both, len(report.pushshift_only),
+        len(report.praw_only)
+    )
+    return data, report
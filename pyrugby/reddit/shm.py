@@ -0,0 +1,169 @@
+import os
+import logging
+import pathlib
+import tempfile
+import multiprocessing
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+    import pyarrow as pa
+except ImportError:
+    np = pa = None
+
+log = logging.getLogger(__name__)
+
+# Callers fall back to pickling data to workers without these
+AVAILABLE = np is not None and pa is not None
+
+# Prefer a RAM backed directory for the Arrow file where there is one
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# The FrameView of the worker process, set by the pool initializer
+_view = None
+
+
+def _to_arrow(values):
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        return values
+    if not hasattr(values, '__len__'):
+        values = list(values)
+    return pa.array(values, type=pa.string(), from_pandas=True)
+
+
+class FrameView():
+    # Worker side view of a SharedFrame. Input columns are memory mapped
+    # from the Arrow file and outputs are numpy arrays over shared memory,
+    # so neither is copied between processes
+    def __init__(self, spec):
+        self.spec = spec
+        self._source = pa.memory_map(spec['path'], 'r')
+        self.table = pa.ipc.open_file(self._source).read_all()
+        self._shms = {}
+        self.outputs = {}
+        for name, (shm_name, dtype) in spec['outputs'].items():
+            shm = shared_memory.SharedMemory(name=shm_name)
+            self._shms[name] = shm
+            self.outputs[name] = np.ndarray(
+                (spec['nrows'],), dtype=dtype, buffer=shm.buf
+            )
+
+    def column(self, name, start=0, stop=None):
+        stop = self.spec['nrows'] if stop is None else stop
+        return self.table.column(name).slice(start, stop - start)
+
+    def values(self, name, start=0, stop=None):
+        return self.column(name, start, stop).to_pylist()
+
+    def output(self, name):
+        return self.outputs[name]
+
+    def close(self):
+        self.outputs.clear()
+        for shm in self._shms.values():
+            shm.close()
+        self._shms.clear()
+        self.table = None
+        self._source.close()
+
+
+def _init_worker(spec, initializer, initargs):
+    global _view
+    _view = FrameView(spec)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _run_chunk(task):
+    func, start, stop = task
+    return func(_view, start, stop)
+
+
+class SharedFrame():
+    # Hands comment columns to worker processes without pickling them.
+    # The input columns are written once to an Arrow IPC file which workers
+    # memory map, and each output column is a block of shared memory that
+    # workers fill in place for their rows. Only row ranges are sent to
+    # workers; a chunk function's return value is still pickled back, so it
+    # should be reserved for results which are not fixed width
+    def __init__(self, columns, directory=SHM_DIR):
+        arrays = {name: _to_arrow(values) for name, values in columns.items()}
+        lengths = {len(a) for a in arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError('Shared columns must all be the same length')
+        self.nrows = lengths.pop() if lengths else 0
+        table = pa.table(arrays)
+        fd, path = tempfile.mkstemp(
+            dir=directory, prefix='pyrugby-', suffix='.arrow'
+        )
+        os.close(fd)
+        self.path = pathlib.Path(path)
+        with pa.OSFile(path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        self._shms = {}
+        self._outputs = {}
+
+    @classmethod
+    def from_frame(cls, df, columns, directory=SHM_DIR):
+        return cls({col: df[col] for col in columns}, directory)
+
+    def add_output(self, name, dtype='float64', fill=0):
+        dtype = np.dtype(dtype)
+        shm = shared_memory.SharedMemory(
+            create=True, size=max(1, self.nrows * dtype.itemsize)
+        )
+        self._shms[name] = shm
+        arr = np.ndarray((self.nrows,), dtype=dtype, buffer=shm.buf)
+        arr.fill(fill)
+        self._outputs[name] = arr
+
+    @property
+    def spec(self):
+        return {
+            'path': str(self.path),
+            'nrows': self.nrows,
+            'outputs': {
+                name: (self._shms[name].name, arr.dtype.str)
+                for name, arr in self._outputs.items()
+            },
+        }
+
+    def result(self, name):
+        # A private copy, as the shared block is freed on close. No other
+        # views of an output may outlive the SharedFrame
+        return self._outputs[name].copy()
+
+    def map(
+        self, func, processes=None, chunksize=2000, initializer=None,
+        initargs=()
+    ):
+        # Runs func(view, start, stop) over row chunks and returns the
+        # chunk results in row order. func must be picklable by reference
+        tasks = [
+            (func, start, min(start + chunksize, self.nrows))
+            for start in range(0, self.nrows, chunksize)
+        ]
+        log.debug(
+            'Running %d chunks on %s processes from %s',
+            len(tasks), processes, self.path
+        )
+        with multiprocessing.Pool(
+            processes, initializer=_init_worker,
+            initargs=(self.spec, initializer, initargs)
+        ) as pool:
+            return pool.map(_run_chunk, tasks, chunksize=1)
+
+    def close(self):
+        self._outputs.clear()
+        for shm in self._shms.values():
+            shm.close()
+            shm.unlink()
+        self._shms.clear()
+        self.path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,177 @@
+import logging
+import pathlib
+
+log = logging.getLogger(__name__)
+
+FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'feather',
+}
+
+FORMAT_SUFFIXES = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# Columns holding python lists. These are stored natively in columnar
+# formats and as comma separated strings in CSV
+LIST_COLUMNS = ('swears', 'swears_root', 'words')
+
+# Known comment columns and the (nullable) dtype they are stored as
+COMMENT_SCHEMA = {
+    'id': 'string',
+    'author': 'string',
+    'author_praw': 'string',
+    'author_flair_css_class': 'string',
+    'author_flair_text': 'string',
+    'flair_id': 'string',
+    'body': 'string',
+    'plaintext': 'string',
+    'markdown': 'string',
+    'html': 'string',
+    'parent_id': 'string',
+    'link_id': 'string',
+    'created_utc': 'Int64',
+    'created_utc_praw': 'Float64',
+    'score': 'Int64',
+    'score_praw': 'Int64',
+    'controversiality': 'Int64',
+    'controversiality_praw': 'Int64',
+    'depth': 'Int64',
+    'score_hidden': 'boolean',
+    'removed_praw': 'boolean',
+    'praw': 'boolean',
+    'source': 'category',
+    'body_source': 'category',
+    'author_source': 'category',
+    'created_utc_source': 'category',
+    'vader_score': 'Float64',
+    'google_score': 'Float64',
+    'google_magnitude': 'Float64',
+    'flair_country': 'string',
+    'flair_league': 'string',
+    'flair_club': 'string',
+}
+
+
+def comments_format(path, fmt=None):
+    if fmt is not None:
+        return fmt
+    suffix = pathlib.Path(path).suffix.lower()
+    try:
+        return FORMATS[suffix]
+    except KeyError:
+        raise ValueError(f'Unrecognised comment file format: {path}')
+
+
+def comments_path(outdir, stem, fmt='csv'):
+    return pathlib.Path(outdir or '', f'{stem}{FORMAT_SUFFIXES[fmt]}')
+
+
+def _is_list_column(series):
+    return series.dtype == object and series.map(
+        lambda x: isinstance(x, (list, tuple))
+    ).any()
+
+
+def apply_schema(df):
+    for col, dtype in COMMENT_SCHEMA.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        try:
+            df[col] = df[col].astype(dtype)
+        except (TypeError, ValueError):
+            log.warning(
+                'Could not convert column "%s" to %s; leaving as %s',
+                col, dtype, df[col].dtype
+            )
+    return df
+
+
+def _lists_to_strings(df):
+    for col in LIST_COLUMNS:
+        if col in df.columns and _is_list_column(df[col]):
+            df[col] = df[col].map(
+                lambda x: ','.join(x) if isinstance(x, (list, tuple)) else x
+            )
+    return df
+
+
+def _strings_to_lists(df):
+    for col in LIST_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].map(
+                lambda x: x.split(',') if isinstance(x, str) and x else []
+            )
+    return df
+
+
+def _arrays_to_lists(df):
+    # Arrow round-trips list columns as numpy arrays
+    for col in LIST_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].map(
+                lambda x: [] if x is None or isinstance(x, float) else list(x)
+            )
+    return df
+
+
+def write_comments(df, path, fmt=None):
+    fmt = comments_format(path, fmt)
+    if df.index.name is not None:
+        df = df.reset_index()
+    else:
+        df = df.copy()
+    df = apply_schema(df)
+    log.info('Saving %d comments to %s (%s)', len(df), path, fmt)
+    if fmt == 'csv':
+        _lists_to_strings(df).to_csv(path, index=False)
+    elif fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        raise ValueError(f'Unrecognised comment file format: {fmt}')
+
+
+def append_comments(df, path):
+    # Appends rows to an existing CSV without rewriting it. Columnar files
+    # cannot be appended to and must be rewritten with write_comments
+    import pandas as pd
+
+    if df.index.name is not None:
+        df = df.reset_index()
+    else:
+        df = df.copy()
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    dropped = [c for c in df.columns if c not in columns]
+    if dropped:
+        log.warning(
+            'Columns not in %s are not appended: %s', path, dropped
+        )
+    df = apply_schema(df).reindex(columns=columns)
+    log.info('Appending %d comments to %s', len(df), path)
+    _lists_to_strings(df).to_csv(path, mode='a', header=False, index=False)
+
+
+def read_comments(path, fmt=None, columns=None):
+    import pandas as pd
+
+    fmt = comments_format(path, fmt)
+    log.info('Loading comments from %s (%s)', path, fmt)
+    if fmt == 'csv':
+        df = _strings_to_lists(pd.read_csv(
+            path, usecols=columns,
+            dtype={'swears': object, 'swears_root': object}
+        ))
+    elif fmt == 'parquet':
+        df = _arrays_to_lists(pd.read_parquet(path, columns=columns))
+    elif fmt == 'feather':
+        df = _arrays_to_lists(pd.read_feather(path, columns=columns))
+    else:
+        raise ValueError(f'Unrecognised comment file format: {fmt}')
+    return apply_schema(df)
@@ -0,0 +1,282 @@
+import time
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import collections
+from dataclasses import dataclass, field
+
+from .. import instrument
+from .utils import (
+    get_all_pushshift_comments, get_flair_identifier, comment_md_to_plaintext,
+    praw_comment_to_dict
+)
+from .tokens import candidate_words, count_tokens
+
+log = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class MinuteBucket():
+    minute: int
+    comments: int = 0
+    sentiment_sum: float = 0.0
+    sentiment_n: int = 0
+    swears: int = 0
+    words: int = 0
+    flairs: collections.Counter = field(default_factory=collections.Counter)
+
+    def add(self, comment):
+        self.comments += 1
+        if comment.get('vader_score') is not None:
+            self.sentiment_sum += comment['vader_score']
+            self.sentiment_n += 1
+        self.swears += len(comment.get('swears') or ())
+        self.words += comment.get('words') or 0
+        self.flairs[comment.get('flair_id')] += 1
+
+    def summary(self, top_flairs=3):
+        return {
+            'minute': self.minute,
+            'comments': self.comments,
+            'sentiment_mean': (
+                self.sentiment_sum / self.sentiment_n
+                if self.sentiment_n else None
+            ),
+            'swears': self.swears,
+            'words': self.words,
+            'top_flairs': self.flairs.most_common(top_flairs),
+        }
+
+
+class RollingWindow():
+    def __init__(self, minutes=10):
+        self.minutes = minutes
+        self.buckets = {}
+        self.latest = None
+        self._lock = threading.Lock()
+
+    def add(self, comment):
+        minute = int(comment['created_utc'] // 60)
+        with self._lock:
+            if self.latest is None or minute > self.latest:
+                self.latest = minute
+                for old in [
+                    m for m in self.buckets if m <= minute - self.minutes
+                ]:
+                    del self.buckets[old]
+            elif minute <= self.latest - self.minutes:
+                # Too late for the window
+                return False
+            bucket = self.buckets.get(minute)
+            if bucket is None:
+                bucket = self.buckets[minute] = MinuteBucket(minute)
+            bucket.add(comment)
+            return True
+
+    def summary(self):
+        with self._lock:
+            return [self.buckets[m].summary() for m in sorted(self.buckets)]
+
+
+class CommentProcessor():
+    def __init__(self, analyzer=None, profane=None, flairs=None):
+        # analyzer: a VADER SentimentIntensityAnalyzer
+        # profane: callable taking a word and returning its profanity or None
+        # flairs: a FlairRegistry, which counts unrecognised flairs
+        self.analyzer = analyzer
+        self.profane = profane
+        self.flairs = flairs
+        self._profane_cache = {}
+
+    def _swears(self, text):
+        swears = []
+        for word in candidate_words(text):
+            if word not in self._profane_cache:
+                self._profane_cache[word] = self.profane(word)
+            if self._profane_cache[word]:
+                swears.append(self._profane_cache[word])
+        return swears
+
+    def __call__(self, comment):
+        if self.flairs is not None:
+            comment['flair_id'] = self.flairs.identify(comment)
+            comment['flair'] = self.flairs.get(comment['flair_id'])
+        else:
+            comment['flair_id'] = get_flair_identifier(comment)
+        text = comment_md_to_plaintext(comment.get('body') or '')
+        comment['plaintext'] = text
+        comment['words'] = count_tokens(text)
+        if self.analyzer is not None:
+            comment['vader_score'] = self.analyzer.polarity_scores(
+                text
+            )['compound']
+        if self.profane is not None:
+            comment['swears'] = self._swears(text)
+        return comment
+
+
+def praw_comment_source(submission, stop_event=None, interval=5):
+    # pause_after=0 hands back None after every empty response so the stop
+    # event is checked, but also skips PRAW's own backoff. Wait `interval`
+    # seconds on those so quiet periods don't spend the shared rate limit
+    link_id = submission.fullname
+    subreddit = submission.subreddit
+    for comment in subreddit.stream.comments(
+        skip_existing=True, pause_after=0
+    ):
+        if stop_event is not None and stop_event.is_set():
+            return
+        if comment is None:
+            if stop_event is not None:
+                if stop_event.wait(interval):
+                    return
+            else:
+                time.sleep(interval)
+            continue
+        if comment.link_id != link_id:
+            continue
+        dikt = praw_comment_to_dict(comment)
+        dikt['body'] = comment.body
+        dikt['author_flair_css_class'] = comment.author_flair_css_class
+        dikt['author_flair_richtext'] = comment.author_flair_richtext
+        yield dikt
+
+
+def pushshift_poll_source(
+    submission_id, interval=5, after=None, base_url=None, stop_event=None,
+    overlap=60
+):
+    # Pushshift can ingest comments late, with timestamps at or before ones
+    # already returned, so each poll reaches back `overlap` seconds before
+    # the newest comment seen and skips ids which were already yielded
+    newest = int(time.time()) if after is None else after
+    seen = {}
+    while stop_event is None or not stop_event.is_set():
+        comments = get_all_pushshift_comments(
+            submission_id, after=newest - overlap, base_url=base_url
+        )
+        for comment in comments:
+            if comment['id'] in seen:
+                continue
+            seen[comment['id']] = comment['created_utc']
+            yield comment
+        if comments:
+            newest = max(newest, max(c['created_utc'] for c in comments))
+        # Ids older than the overlap can't be returned again
+        cutoff = newest - overlap
+        seen = {cid: t for cid, t in seen.items() if t > cutoff}
+        if stop_event is not None:
+            if stop_event.wait(interval):
+                return
+        else:
+            time.sleep(interval)
+
+
+class CommentStream():
+    def __init__(
+        self, source, process, window=None, workers=4, queue_size=1000,
+        on_comment=None, stop_event=None
+    ):
+        # source: a (blocking) iterable of comment dicts. It should check
+        # stop_event so it can be stopped while waiting for comments
+        self.source = source
+        self.process = process
+        self.window = window or RollingWindow()
+        self.workers = workers
+        self.queue_size = queue_size
+        self.on_comment = on_comment
+        self.stop_event = stop_event or threading.Event()
+        self.latencies = collections.deque(maxlen=1000)
+
+    def _put(self, loop, queue, item):
+        # Blocks while the queue is full, so a slow pipeline slows the source
+        try:
+            fut = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        except RuntimeError:
+            return False
+        while True:
+            try:
+                fut.result(timeout=0.5)
+                return True
+            except concurrent.futures.TimeoutError:
+                if self.stop_event.is_set():
+                    fut.cancel()
+                    return False
+
+    def _produce(self, loop, queue):
+        # Runs in a thread
+        try:
+            for comment in self.source:
+                if self.stop_event.is_set():
+                    return
+                comment['_received'] = time.perf_counter()
+                if not self._put(loop, queue, comment):
+                    return
+        except Exception:
+            log.exception('Comment source failed')
+        for _ in range(self.workers):
+            if not self._put(loop, queue, _STOP):
+                return
+
+    async def _consume(self, queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            comment = await queue.get()
+            if comment is _STOP:
+                return
+            try:
+                comment = await loop.run_in_executor(
+                    None, self.process, comment
+                )
+            except Exception:
+                log.exception('Failed to process comment: %s', comment)
+                continue
+            self.window.add(comment)
+            latency = time.perf_counter() - comment.pop('_received')
+            self.latencies.append(latency)
+            instrument.METRICS.record('stream.latency', latency)
+            instrument.count('stream.comments')
+            if self.on_comment is not None:
+                self.on_comment(comment)
+
+    async def _report(self, every, callback):
+        while not self.stop_event.is_set():
+            await asyncio.sleep(every)
+            callback(self)
+
+    async def run(self, report_every=None, on_report=None, duration=None):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.queue_size)
+        producer = loop.run_in_executor(None, self._produce, loop, queue)
+        consumers = [
+            asyncio.ensure_future(self._consume(queue))
+            for _ in range(self.workers)
+        ]
+        reporter = None
+        if report_every and on_report is not None:
+            reporter = asyncio.ensure_future(
+                self._report(report_every, on_report)
+            )
+        try:
+            if duration is not None:
+                await asyncio.wait(consumers, timeout=duration)
+            else:
+                await asyncio.gather(*consumers)
+        finally:
+            self.stop_event.set()
+            if reporter is not None:
+                reporter.cancel()
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+            # The producer exits at its next comment or poll
+            await producer
+
+    def latency_percentile(self, pct=95):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
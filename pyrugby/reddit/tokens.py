@@ -0,0 +1,116 @@
+import re
+import logging
+import itertools
+import multiprocessing
+
+log = logging.getLogger(__name__)
+
+# Words (allowing internal apostrophes and hyphens), numbers and single
+# punctuation marks. Close to, but cheaper than, nltk.word_tokenize
+TOKEN_RE = re.compile(r"\w+(?:['’-]\w+)*|[^\w\s]")
+# The word tokens of TOKEN_RE which contain at least one letter. Digits are
+# kept as profanities are often disguised with them (e.g. "b1tch")
+WORD_RE = re.compile(r"(?=[\w'’-]*[^\W\d_])\w+(?:['’-]\w+)*")
+
+_vocabulary = None
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text)
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    return sum(1 for _ in TOKEN_RE.finditer(text))
+
+
+def candidate_words(text, vocabulary=None):
+    if not text:
+        return []
+    words = (w.lower() for w in WORD_RE.findall(text))
+    if vocabulary is None:
+        return list(words)
+    return [w for w in words if w in vocabulary]
+
+
+def token_stats(text, vocabulary=None):
+    if not isinstance(text, str):
+        return 0, []
+    return count_tokens(text), candidate_words(text, vocabulary)
+
+
+def iter_token_stats(texts, vocabulary=None):
+    for text in texts:
+        yield token_stats(text, vocabulary)
+
+
+def _init_worker(vocabulary):
+    global _vocabulary
+    _vocabulary = vocabulary
+
+
+def _chunk_stats(texts):
+    return [token_stats(text, _vocabulary) for text in texts]
+
+
+def _shared_chunk_stats(view, start, stop):
+    # Counts are written straight into the shared output; only the
+    # (usually short) candidate lists are sent back
+    counts = view.output('words')
+    candidates = []
+    texts = view.values('text', start, stop)
+    for i, text in enumerate(texts, start):
+        counts[i], words = token_stats(text, _vocabulary)
+        candidates.append(words)
+    return candidates
+
+
+def _shared_token_stats(texts, vocabulary, processes, chunksize):
+    from . import shm
+
+    with shm.SharedFrame({'text': texts}) as shared:
+        shared.add_output('words', 'int64')
+        chunks = shared.map(
+            _shared_chunk_stats, processes, chunksize,
+            initializer=_init_worker, initargs=(vocabulary,)
+        )
+        counts = shared.result('words').tolist()
+    return counts, [words for chunk in chunks for words in chunk]
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def token_stats_batch(texts, vocabulary=None, processes=None, chunksize=2000):
+    if vocabulary is not None:
+        vocabulary = frozenset(w.lower() for w in vocabulary)
+    if processes and processes > 1:
+        # Only imported here as numpy and pyarrow are slow to import
+        from . import shm
+    if not processes or processes == 1:
+        results = list(iter_token_stats(texts, vocabulary))
+    elif shm.AVAILABLE:
+        log.debug('Tokenizing on %d processes via shared memory', processes)
+        return _shared_token_stats(texts, vocabulary, processes, chunksize)
+    else:
+        log.debug('Tokenizing on %d processes', processes)
+        with multiprocessing.Pool(
+            processes, initializer=_init_worker, initargs=(vocabulary,)
+        ) as pool:
+            results = [
+                stats
+                for chunk in pool.imap(
+                    _chunk_stats, _chunks(texts, chunksize)
+                )
+                for stats in chunk
+            ]
+    counts = [c for c, _ in results]
+    candidates = [w for _, w in results]
+    return counts, candidates
@@ -3,36 +3,57 @@ import re
 import time
 import datetime
 
-import requests
-import markdown
-from bs4 import BeautifulSoup
+from .. import instrument
 
 log = logging.getLogger(__name__)
 PUSHSHIFT_URL = "https://api.pushshift.io/reddit/{search_type}/search"
 
 
-def get_all_pushshift_comments(submission_id):
+@instrument.timed('pushshift.fetch')
+def get_all_pushshift_comments(submission_id, after=None, base_url=None):
+    import requests
+
     start = time.time()
-    url = PUSHSHIFT_URL.format(search_type='comment')
+    url = (base_url or PUSHSHIFT_URL).format(search_type='comment')
     params = {
         'link_id': submission_id,
         'sort_type': "created_utc",
-        'sort': "desc",
         'size': 1000,
-        'before': int(
+    }
+    if after is None:
+        params['sort'] = "desc"
+        params['before'] = int(
             datetime.datetime.now(datetime.timezone.utc).timestamp()
         )
-    }
+    else:
+        # Walk forwards from `after` so only newer comments are fetched
+        params['sort'] = "asc"
+        params['after'] = int(after)
     all_comments = []
+    seen = set()
     while True:
         r = requests.get(url, params=params)
+        instrument.count('pushshift.requests')
+        instrument.count('pushshift.bytes', len(r.content))
         data = r.json()['data']
+        instrument.count('pushshift.comments', len(data))
         if not data:
             break
-        all_comments.extend(data)
+        if after is None:
+            all_comments.extend(data)
+        else:
+            # Pages overlap by a second so drop comments already seen
+            new = [c for c in data if c['id'] not in seen]
+            seen.update(c['id'] for c in new)
+            all_comments.extend(new)
+            if not new:
+                break
         if len(data) < params['size']:
             break
-        params['before'] = data[-1]['created_utc'] + 1
+        if after is None:
+            params['before'] = data[-1]['created_utc'] + 1
+        else:
+            params['after'] = data[-1]['created_utc'] - 1
     end = time.time()
     log.debug(
         'Retrieved %d total comments in %d seconds',
@@ -49,11 +70,10 @@ def flair_id_from_template(flairdikt):
             if d.get('e') == 'emoji'
         ]
         if not emojis:
-            print('WARNING: Flair with richtext but no emoji!')
-            print(flairdikt)
+            log.warning('Flair with richtext but no emoji! | %s', flairdikt)
             return False
         if len(emojis) > 1:
-            print(f'WARNING: More than one emoji found! {emojis}')
+            log.warning('More than one emoji found! | %s', emojis)
         return emojis[0]
     else:
         return flairdikt['css_class']
@@ -68,17 +88,22 @@ def get_flair_identifier(comm):
             d in comm['author_flair_richtext']
             if d.get('e') == 'emoji'
         ]
+        # Per comment, so only logged at debug level
         if not emojis:
-            print('WARNING: Comment with richtext but no emoji!')
+            log.debug('Comment with richtext but no emoji!')
             return None
         if len(emojis) > 1:
-            print(f'WARNING: More than one emoji found! {emojis}')
+            log.debug('More than one emoji found! | %s', emojis)
         return emojis[0]
     else:
         return comm['author_flair_css_class']
 
 
 def comment_md_to_plaintext(mdtext):
+    # Imported here as they are slow to import and only needed for this
+    import markdown
+    from bs4 import BeautifulSoup
+
     html = markdown.markdown(mdtext)
     soup = BeautifulSoup(html, features="html.parser")
     comment = "".join(soup.find_all(text=True))
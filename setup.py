@@ -6,10 +6,30 @@ setup(
     description='Scraping rugby related data from various sources on the web',
     url='https://github.com/awgymer/pyrugby',
     author='Arthur Gymer',
-    packages=find_packages(),
+    packages=find_packages(exclude=[
+        'benchmarks', 'benchmarks.*', 'tests', 'tests.*'
+    ]),
     install_requires=[
         'requests',
         'markdown',
         'beautifulsoup4'
-    ]
+    ],
+    extras_require={
+        'columnar': ['pandas', 'pyarrow'],
+        'analysis': ['numpy', 'pandas'],
+        'cli': [
+            'pandas',
+            'praw',
+            'tqdm',
+            'profanity_filter',
+            'vaderSentiment',
+            'google-cloud-language',
+        ],
+    },
+    entry_points={
+        'console_scripts': [
+            'pyrugby-match-thread=pyrugby.cli:run',
+            'pyrugby-timelines=pyrugby.cmsapi.diff:run',
+        ],
+    }
 )
@@ -0,0 +1,129 @@
+import time
+import threading
+
+import pytest
+
+from pyrugby.cmsapi.cache import TimelineCache
+from pyrugby.cmsapi.models import Timeline
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Loader():
+    def __init__(self, status='C', nbytes=None, error=None):
+        self.status = status
+        self.nbytes = nbytes
+        self.error = error
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, match_id):
+        self.calls.append(match_id)
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        timeline = Timeline(match_id, data={
+            'match': {'status': self.status, 'teams': [{'id': 1}, {'id': 2}]},
+            'timeline': [],
+        })
+        timeline.nbytes = self.nbytes
+        return timeline
+
+
+def _get_concurrently(cache, match_id, n=8):
+    results = [None] * n
+
+    def _get(i):
+        try:
+            results[i] = cache.get(match_id)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=_get, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    # Give every thread the chance to find the load in progress
+    time.sleep(0.1)
+    return threads, results
+
+
+def test_cache_loads_each_match_once():
+    loader = Loader()
+    loader.release.clear()
+    cache = TimelineCache(loader=loader)
+    threads, results = _get_concurrently(cache, 1)
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == [1]
+    assert all(r is results[0] for r in results)
+    assert cache.get(1) is results[0]
+    assert loader.calls == [1]
+
+
+def test_cache_load_errors_reach_waiters():
+    loader = Loader(error=ValueError('no match'))
+    loader.release.clear()
+    cache = TimelineCache(loader=loader)
+    threads, results = _get_concurrently(cache, 1)
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(r, ValueError) for r in results)
+    assert 1 not in cache
+    # The failure isn't cached
+    loader.error = None
+    assert cache.get(1).match_id == 1
+
+
+def test_cache_evicts_least_recently_used():
+    loader = Loader()
+    cache = TimelineCache(maxsize=2, loader=loader)
+    cache.get(1)
+    cache.get(2)
+    cache.get(1)
+    cache.get(3)
+    assert 1 in cache and 3 in cache
+    assert 2 not in cache
+    assert len(cache) == 2
+
+
+def test_cache_evicts_by_payload_bytes():
+    loader = Loader(nbytes=100)
+    cache = TimelineCache(max_payload_bytes=250, loader=loader)
+    for match_id in (1, 2, 3):
+        cache.get(match_id)
+    assert 1 not in cache
+    assert cache.payload_bytes == 200
+    cache.invalidate(2)
+    assert cache.payload_bytes == 100
+
+
+@pytest.mark.parametrize('status, ttl', [('L1', 15), ('U', 300)])
+def test_cache_expires_by_status(status, ttl):
+    clock = FakeClock()
+    loader = Loader(status=status)
+    cache = TimelineCache(loader=loader, clock=clock)
+    first = cache.get(1)
+    clock.now = ttl - 1
+    assert cache.get(1) is first
+    clock.now = ttl
+    assert 1 not in cache
+    assert cache.get(1) is not first
+    assert loader.calls == [1, 1]
+
+
+def test_cache_keeps_completed_matches():
+    clock = FakeClock()
+    loader = Loader(status='C')
+    cache = TimelineCache(loader=loader, clock=clock)
+    first = cache.get(1)
+    clock.now = 10 ** 6
+    assert cache.get(1) is first
@@ -0,0 +1,76 @@
+import copy
+
+import pytest
+
+from pyrugby.cmsapi.diff import (
+    TimelineArchive, apply_diff, content_hash, diff_timelines
+)
+
+
+def _event(etype, secs, team=0, **extra):
+    return {'type': etype, 'time': {'secs': secs}, 'teamIndex': team, **extra}
+
+
+OLD = {
+    'match': {'status': 'L2', 'scores': [10, 3]},
+    'timeline': [
+        _event('T5', 100, points=5, playerId=1),
+        _event('Sub On', 200, 1),
+        _event('Sub On', 200, 1, playerId=3),
+        _event('P3', 300, points=3),
+    ],
+    'extra': {'a': 1},
+    'dropped': True,
+}
+
+
+def _edited():
+    new = copy.deepcopy(OLD)
+    new['timeline'][0]['playerId'] = 9
+    new['timeline'].insert(2, _event('Yellow', 210, 1))
+    del new['timeline'][4]
+    new['timeline'].append(_event('C2', 400))
+    new['match']['scores'] = [12, 3]
+    new['match']['status'] = 'C'
+    new['extra'] = {'a': 2}
+    new['added'] = [1]
+    del new['dropped']
+    return new
+
+
+@pytest.mark.parametrize('new', [
+    copy.deepcopy(OLD),
+    _edited(),
+    {'match': {}, 'timeline': []},
+    {**copy.deepcopy(OLD), 'timeline': list(reversed(OLD['timeline']))},
+])
+def test_apply_diff_round_trip(new):
+    diff = diff_timelines(OLD, new)
+    assert apply_diff(copy.deepcopy(OLD), diff) == new
+    assert diff.empty == (content_hash(OLD) == content_hash(new))
+
+
+def test_diff_reports_changes():
+    diff = diff_timelines(OLD, _edited())
+    assert diff.summary()['added'] == 2
+    assert diff.summary()['removed'] == 1
+    assert diff.changed[0][1] == {'playerId': (1, 9)}
+    assert diff.keys_changed == {'extra': {'a': 2}, 'added': [1]}
+    assert diff.keys_removed == ['dropped']
+
+
+def test_archive_update_keeps_manifest_in_sync(tmp_path):
+    store = {1: copy.deepcopy(OLD)}
+    archive = TimelineArchive(tmp_path, fetch=store.get)
+    assert archive.refresh(1) is not None
+    assert archive.refresh(1) is None
+    store[1] = _edited()
+    assert not archive.refresh(1).empty
+    assert archive.load(1) == store[1]
+    assert content_hash(archive.load(1)) == archive.manifest['1']
+
+
+def test_read_only_archive_is_not_created(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        TimelineArchive(tmp_path / 'missing', create=False)
+    assert not (tmp_path / 'missing').exists()
@@ -0,0 +1,197 @@
+import sys
+import types
+import threading
+
+import pytest
+
+from pyrugby.reddit.expand import RateLimiter, expand_comments, limiter_for
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, secs):
+        with self._lock:
+            self.now += secs
+
+
+def test_limiter_bursts_to_capacity_then_waits():
+    clock = FakeClock()
+    limiter = RateLimiter(10, 60, clock=clock, sleep=clock.sleep)
+    for _ in range(10):
+        limiter.acquire()
+    assert clock.now == 0
+    limiter.acquire()
+    assert clock.now == 6.0
+
+
+def test_limiter_is_shared_between_threads():
+    clock = FakeClock()
+    limiter = RateLimiter(10, 60, clock=clock, sleep=clock.sleep)
+
+    def _requests():
+        for _ in range(5):
+            with limiter:
+                pass
+
+    threads = [threading.Thread(target=_requests) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 40 requests against a 10 request burst and 1 request every 6s
+    assert clock.now >= 30 * 6.0
+
+
+def test_limiter_follows_headers():
+    clock = FakeClock()
+    limiter = RateLimiter(100, 60, clock=clock, sleep=clock.sleep)
+    limiter.update(remaining=0, reset_in=20)
+    limiter.acquire()
+    assert clock.now == 20
+
+
+def test_limiter_for_is_per_instance():
+    class Reddit():
+        pass
+    first, second = Reddit(), Reddit()
+    assert limiter_for(first) is limiter_for(first)
+    assert limiter_for(first) is not limiter_for(second)
+
+
+class MoreComments():
+    def __init__(self, children=(), parent_id=None, replies=()):
+        self.children = list(children)
+        self.parent_id = parent_id
+        self.replies = list(replies)
+
+    def comments(self):
+        return Forest(self.replies)
+
+
+class Forest():
+    def __init__(self, comments):
+        self.comments = comments
+
+    def list(self):
+        return list(self.comments)
+
+
+class Comment():
+    def __init__(self, id):
+        self.id = id
+
+
+class Reddit():
+    # Answers morechildren requests from a map of id -> what it expands to
+    def __init__(self, hidden):
+        self.hidden = hidden
+        self.posts = []
+
+    def post(self, path, data):
+        self.posts.append((path, data))
+        return [
+            item for i in data['children'].split(',')
+            for item in self.hidden.get(i, [Comment(i)])
+        ]
+
+    def get(self, path, params):
+        raise AssertionError('morechildren must be a POST')
+
+
+class Submission():
+    fullname = 't3_abc123'
+    comment_sort = 'confidence'
+
+    def __init__(self, reddit, top_level):
+        self._reddit = reddit
+        self.comments = Forest(top_level)
+
+
+@pytest.fixture
+def expand(monkeypatch):
+    # expand_comments only needs praw for the MoreComments type
+    praw = types.ModuleType('praw')
+    praw.models = types.ModuleType('praw.models')
+    praw.models.MoreComments = MoreComments
+    monkeypatch.setitem(sys.modules, 'praw', praw)
+    monkeypatch.setitem(sys.modules, 'praw.models', praw.models)
+
+    def _expand(top_level, hidden=None, **kwargs):
+        reddit = Reddit(hidden or {})
+        submission = Submission(reddit, top_level)
+        clock = FakeClock()
+        result = expand_comments(
+            submission, limiter=RateLimiter(
+                1000, 60, clock=clock, sleep=clock.sleep
+            ), **kwargs
+        )
+        return result, reddit
+
+    return _expand
+
+
+def _ids(n, prefix='c'):
+    return [f'{prefix}{i}' for i in range(n)]
+
+
+def test_expand_batches_hidden_comments(expand):
+    result, reddit = expand([Comment('top'), MoreComments(_ids(250))])
+    assert [len(data['children'].split(',')) for _, data in reddit.posts] \
+        == [100, 100, 50]
+    assert all(
+        path == 'api/morechildren/' and data['link_id'] == 't3_abc123'
+        for path, data in reddit.posts
+    )
+    assert result.requests == 3
+    assert result.complete
+    assert sorted(c.id for c in result.comments) \
+        == sorted(['top', *_ids(250)])
+
+
+def test_expand_follows_nested_more_comments(expand):
+    hidden = {'c1': [Comment('c1'), MoreComments(['d0', 'd1'])]}
+    result, reddit = expand([MoreComments(['c0', 'c1'])], hidden)
+    assert len(reddit.posts) == 2
+    assert {c.id for c in result.comments} == {'c0', 'c1', 'd0', 'd1'}
+
+
+def test_expand_stops_at_known_comments(expand):
+    result, reddit = expand(
+        [MoreComments(_ids(50))], known_ids=_ids(50)
+    )
+    assert reddit.posts == []
+    assert result.skipped == _ids(50)
+    assert result.complete
+
+
+def test_expand_request_budget_leaves_unexpanded(expand):
+    result, reddit = expand([MoreComments(_ids(250))], max_requests=1)
+    assert result.requests == len(reddit.posts) == 1
+    assert sorted(result.unexpanded) == sorted(_ids(250)[100:])
+    assert not result.complete
+
+
+def test_expand_time_budget_leaves_unexpanded(expand):
+    more = MoreComments(parent_id='t1_deep')
+    result, reddit = expand(
+        [MoreComments(_ids(10)), more], time_budget=0
+    )
+    assert reddit.posts == []
+    assert result.unexpanded == [*_ids(10), 't1_deep']
+
+
+def test_expand_continue_this_thread(expand):
+    more = MoreComments(
+        parent_id='t1_deep', replies=[Comment('e0'), Comment('e1')]
+    )
+    result, reddit = expand([Comment('top'), more])
+    assert reddit.posts == []
+    assert result.requests == 1
+    assert {c.id for c in result.comments} == {'top', 'e0', 'e1'}
+    assert result.complete
@@ -0,0 +1,44 @@
+import json
+
+import pandas as pd
+
+from pyrugby.reddit.flairs import NO_FLAIR, FlairRegistry
+
+TEMPLATES = [
+    {'css_class': '', 'richtext': [
+        {'e': 'emoji', 'a': ':Leinster:'}, {'e': 'text', 't': 'Toronto Arrows'}
+    ]},
+    {'css_class': '', 'richtext': [{'e': 'emoji', 'a': ':Samoa-flag:'}]},
+    {'css_class': '', 'richtext': [{'e': 'emoji', 'a': ':Mystery:'}]},
+]
+
+
+def test_load_templates_classifies_new_flairs(tmp_path):
+    path = tmp_path / 'templates.json'
+    path.write_text(json.dumps(TEMPLATES))
+    flairs = FlairRegistry.load(path)
+    assert flairs.get(':Leinster:')['club'] == 'toronto arrows'
+    assert flairs.get(':Samoa-flag:')['country'] == 'samoa'
+    assert flairs.get(':Mystery:') == NO_FLAIR
+
+
+def test_lookup_treats_na_as_no_flair():
+    flairs = FlairRegistry()
+    ids = pd.Series([':England-flag:', None, 'unknown-flair', None],
+                    dtype='string')
+    info = flairs.lookup(ids)
+    assert info[0]['country'] == 'england'
+    assert info[1] == NO_FLAIR
+    assert flairs.unknown == {'unknown-flair': 1}
+
+
+def test_unknown_flairs_are_reported_once(caplog):
+    flairs = FlairRegistry()
+    comment = {'author_flair_richtext': [{'e': 'emoji', 'a': ':Nope:'}]}
+    flairs.tag([dict(comment) for _ in range(50)])
+    flairs.lookup(['unknown-flair'] * 3)
+    flairs.report()
+    warnings = [r for r in caplog.records if r.levelname == 'WARNING']
+    assert len(warnings) == 1
+    assert ':Nope: (50)' in warnings[0].getMessage()
+    assert 'unknown-flair (3)' in warnings[0].getMessage()
@@ -0,0 +1,67 @@
+from pyrugby.reddit.merge import merge_comments
+
+
+def _push(cid, body='push body', author='a', created=100):
+    return {'id': cid, 'author': author, 'body': body, 'created_utc': created}
+
+
+def _praw(cid, markdown='praw body', author='a', created=100.0):
+    return {
+        'id': cid, 'author': author, 'markdown': markdown,
+        'created_utc': created, 'score_praw': 3, 'praw': True,
+    }
+
+
+def _rows(data):
+    return {
+        cid: {col: values[i] for col, values in data.items()}
+        for i, cid in enumerate(data['id'])
+    }
+
+
+def test_merge_sources_and_duplicates():
+    data, report = merge_comments(
+        [_push('a'), _push('b'), _push('a', body='repeat')],
+        [_praw('b'), _praw('c'), _praw('b', markdown='repeat'), _praw('c')],
+    )
+    rows = _rows(data)
+    assert data['id'] == ['a', 'b', 'c']
+    assert report.pushshift_only == ['a']
+    assert report.praw_only == ['c']
+    assert report.both == 1
+    assert report.duplicates == 3
+    assert [rows[c]['source'] for c in 'abc'] == ['pushshift', 'both', 'praw']
+    # The first of each duplicate is kept
+    assert rows['a']['body'] == 'push body'
+    assert rows['b']['markdown'] == 'praw body'
+
+
+def test_merge_suffixes_clashing_praw_columns():
+    data, _ = merge_comments(
+        [_push('a', author='push')], [_praw('a', author='praw', created=101.0)]
+    )
+    row = _rows(data)['a']
+    assert row['author'] == 'push'
+    assert row['author_praw'] == 'praw'
+    assert row['created_utc'] == 100
+    assert row['created_utc_praw'] == 101.0
+    assert row['score_praw'] == 3
+    assert 'created_utc_praw_praw' not in data
+
+
+def test_merge_coalesces_praw_only_rows():
+    data, _ = merge_comments(
+        [_push('a', author=None)], [_praw('a', author='x'), _praw('b')]
+    )
+    rows = _rows(data)
+    assert rows['a']['author'] == 'x'
+    assert rows['a']['author_source'] == 'praw'
+    assert rows['a']['body_source'] == 'pushshift'
+    assert rows['a']['markdown'] == 'praw body'
+    # Coalesced values are only kept once
+    assert rows['b']['body'] == 'praw body'
+    assert rows['b']['markdown'] is None
+    assert rows['b']['author_praw'] is None
+    assert [rows['b'][f'{c}_source'] for c in (
+        'body', 'author', 'created_utc'
+    )] == ['praw'] * 3
@@ -0,0 +1,22 @@
+from pyrugby.cmsapi import Timeline
+
+
+def _timeline():
+    stamp = {'millis': 1569661200000, 'gmtOffset': 1.0}
+    return Timeline(1, {
+        'match': {'teams': [{'id': 39}, {'id': 40}]},
+        'timeline': [
+            {'type': 'T5', 'time': {'secs': 176}, 'teamIndex': 0,
+             'points': 5, 'timestamp': stamp},
+            {'type': 'C2', 'time': {'secs': 214}, 'teamIndex': 0,
+             'points': 2},
+        ],
+    })
+
+
+def test_infill_timestamps_uses_milliseconds():
+    timeline = _timeline()
+    timeline.infill_timestamps()
+    first, second = timeline.events
+    assert second.millis - first.millis == 38 * 1000
+    assert second.gmt_offset == first.gmt_offset
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from pyrugby.cmsapi.spatial import PitchGrid, SpatialAggregator, heatmap
+
+FRAME = pd.DataFrame({
+    'event': ['T5', 'P3', 'Sub On'],
+    'team_id': [39, 40, 39],
+    'player_id': [1, 2, 3],
+    'x_pos': [95, 30, None],
+    'y_pos': [50, 10, None],
+    'ex_pos': [96, 60, None],
+    'ey_pos': [50, 20, None],
+    'm_pos': [None, None, None],
+})
+
+
+def test_aggregator_by_team():
+    agg = SpatialAggregator(PitchGrid(4, 2))
+    assert agg.add_frame(FRAME, 1)
+    assert not agg.add_frame(FRAME, 1)
+    heatmaps = agg.heatmaps()
+    assert heatmaps[39].sum() == 1
+    assert heatmaps[40].sum() == 1
+
+
+def test_aggregator_ungrouped():
+    agg = SpatialAggregator(PitchGrid(4, 2), by=None)
+    agg.add_frame(FRAME, 1)
+    agg.add_frame(FRAME, 2)
+    assert (agg.heatmaps()[None] == 2 * heatmap(
+        FRAME, PitchGrid(4, 2), by=None
+    )).all()
+    assert agg.heatmaps(end=True)[None].sum() == 4
+    assert agg.territory().loc[None].sum() == 1.0
+    assert agg.vector_summary().loc[None, 'count'] == 4
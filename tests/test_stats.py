@@ -0,0 +1,72 @@
+import copy
+
+import pandas as pd
+
+from pyrugby.cmsapi import Timeline
+from pyrugby.cmsapi.stats import StatsStore
+
+
+def _timeline(match_id, try_points=5):
+    return Timeline(match_id, {
+        'match': {'status': 'C', 'teams': [{'id': 39}, {'id': 40}]},
+        'timeline': [
+            {'type': 'T5', 'time': {'secs': 100}, 'teamIndex': 0,
+             'playerId': 1, 'points': try_points},
+            {'type': 'P3', 'time': {'secs': 900}, 'teamIndex': 1,
+             'playerId': 2, 'points': 3},
+            {'type': 'Sub Off', 'time': {'secs': 3000}, 'teamIndex': 1,
+             'playerId': 2},
+            {'type': 'Sub On', 'time': {'secs': 3000}, 'teamIndex': 1,
+             'playerId': 3},
+            {'type': 'C2', 'time': {'secs': 4800}, 'teamIndex': 0,
+             'playerId': 1, 'points': 2},
+        ],
+    })
+
+
+def test_ingest_and_totals(tmp_path):
+    store = StatsStore(tmp_path)
+    assert store.ingest_all([_timeline(1), _timeline(2)]) == 2
+    teams = StatsStore(tmp_path).teams()
+    assert teams.loc[39, 'wins'] == 2
+    assert teams.loc[40, 'points_against'] == 14
+    players = StatsStore(tmp_path).players()
+    assert players.loc[(1, 39), 'tries'] == 2
+    assert players.loc[(2, 40), 'minutes'] == 100
+    assert players.loc[(3, 40), 'minutes'] == 60
+
+
+def test_changed_match_replaces_contribution(tmp_path):
+    store = StatsStore(tmp_path)
+    store.ingest_all([_timeline(1), _timeline(2)])
+    store = StatsStore(tmp_path)
+    assert store.ingest_all([_timeline(1)]) == 0
+    assert store.ingest_all([_timeline(1, try_points=7)]) == 1
+    incremental = store.players()
+    store.rebuild()
+    pd.testing.assert_frame_equal(incremental, store.players())
+    assert incremental.loc[(1, 39), 'points'] == 7 + 2 + 5 + 2
+
+
+def test_crash_before_save_keeps_totals_consistent(tmp_path):
+    store = StatsStore(tmp_path)
+    store.ingest_all([_timeline(1)])
+    saved = store.players()
+    # Re-ingest a changed match but never save
+    store.ingest(_timeline(1, try_points=7))
+    store = StatsStore(tmp_path)
+    pd.testing.assert_frame_equal(saved, store.players())
+    store.ingest_all([_timeline(1, try_points=7)])
+    assert store.players().loc[(1, 39), 'points'] == 9
+    assert len(list((tmp_path / 'matches').iterdir())) == 2
+
+
+def test_remove(tmp_path):
+    store = StatsStore(tmp_path)
+    store.ingest_all([_timeline(1), _timeline(2)])
+    assert store.remove(2)
+    store.save()
+    store = StatsStore(tmp_path)
+    assert store.match_ids == ['1']
+    assert store.teams().matches.tolist() == [1, 1]
+    assert copy.copy(store.players()).loc[(1, 39), 'tries'] == 1
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from pyrugby.reddit import storage
+
+
+def _comments(ids, created):
+    return pd.DataFrame({
+        'id': ids,
+        'body': [f'comment {i}' for i in ids],
+        'created_utc': created,
+        'swears': [['hell'] for _ in ids],
+    }).set_index('id')
+
+
+def test_append_comments_matches_stored_columns(tmp_path):
+    path = tmp_path / 'comments.csv'
+    storage.write_comments(_comments(['a', 'b'], [10, 20]), path)
+    new = _comments(['c'], [20])
+    # Reordered columns are written in the stored order
+    new = new[['swears', 'created_utc', 'body']]
+    storage.append_comments(new, path)
+    df = storage.read_comments(path)
+    assert df.id.tolist() == ['a', 'b', 'c']
+    assert df.created_utc.tolist() == [10, 20, 20]
+    assert df.swears.tolist() == [['hell']] * 3
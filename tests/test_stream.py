@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+from benchmarks import pushshift_stub
+from pyrugby.reddit import stream
+from pyrugby.reddit.stream import (
+    CommentProcessor, CommentStream, RollingWindow, praw_comment_source,
+    pushshift_poll_source
+)
+
+
+class WaitCounter(threading.Event):
+    def __init__(self):
+        super().__init__()
+        self.waits = []
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        return super().wait(0)
+
+
+def test_praw_source_waits_on_empty_responses():
+    class Comment():
+        id = 'c1'
+        link_id = 't3_abc'
+        author = None
+        controversiality = score = depth = 0
+        score_hidden = False
+        created_utc = 100.0
+        body = 'Come on!'
+        body_html = None
+        author_flair_css_class = None
+        author_flair_richtext = []
+
+    class Stream():
+        def comments(self, skip_existing, pause_after):
+            assert pause_after == 0
+            yield None
+            yield None
+            yield Comment()
+            stop.set()
+            yield None
+
+    class Submission():
+        fullname = 't3_abc'
+
+        class subreddit():
+            stream = Stream()
+
+    stop = WaitCounter()
+    comments = list(praw_comment_source(Submission(), stop, interval=7))
+    assert len(comments) == 1
+    assert stop.waits == [7, 7]
+
+
+def test_poll_source_picks_up_late_comments(monkeypatch):
+    polls = [
+        [{'id': 'a', 'created_utc': 100}, {'id': 'b', 'created_utc': 105}],
+        # 'c' was ingested late with an older timestamp
+        [{'id': 'b', 'created_utc': 105}, {'id': 'c', 'created_utc': 101},
+         {'id': 'd', 'created_utc': 110}],
+        [{'id': 'd', 'created_utc': 110}],
+    ]
+    afters = []
+    stop = threading.Event()
+
+    def _fake(submission_id, after=None, base_url=None):
+        afters.append(after)
+        if len(afters) == len(polls):
+            stop.set()
+        return [c for c in polls[len(afters) - 1] if c['created_utc'] > after]
+
+    monkeypatch.setattr(stream, 'get_all_pushshift_comments', _fake)
+    source = pushshift_poll_source(
+        'abc', interval=0, after=90, stop_event=stop, overlap=10
+    )
+    assert [c['id'] for c in source] == ['a', 'b', 'c', 'd']
+    assert afters == [80, 95, 100]
+
+
+def test_stream_latency_against_stub():
+    # Steady traffic at several times a busy match thread's comment rate
+    stub = pushshift_stub.StubPushshift(rate=50, late=0.1)
+    server = pushshift_stub.make_server(stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stop = threading.Event()
+    try:
+        source = pushshift_poll_source(
+            'abc', interval=0.5, after=0, stop_event=stop,
+            base_url=pushshift_stub.url(server)
+        )
+        process = CommentProcessor(profane=lambda word: None)
+        ids = []
+        comment_stream = CommentStream(
+            source, process, RollingWindow(), stop_event=stop,
+            on_comment=lambda c: ids.append(c['id'])
+        )
+        asyncio.run(comment_stream.run(duration=3))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert len(ids) > 50
+    assert len(ids) == len(set(ids))
+    assert comment_stream.latency_percentile(95) < 1.0
@@ -0,0 +1,43 @@
+import json
+import pathlib
+
+from pyrugby.reddit import tokens
+
+PROFANITIES = pathlib.Path(__file__).parent.parent / 'reddit_profanities.json'
+
+
+def _vocabulary():
+    with open(PROFANITIES, 'r') as pjson:
+        return {w for words in json.load(pjson).values() for w in words}
+
+
+def test_candidate_words_keeps_digits():
+    assert tokens.candidate_words("You b1tch, what an arseh0le!") == [
+        'you', 'b1tch', 'what', 'an', 'arseh0le'
+    ]
+
+
+def test_candidate_words_skips_numbers():
+    assert tokens.candidate_words('Won 22-10 in the 80th minute') == [
+        'won', 'in', 'the', '80th', 'minute'
+    ]
+
+
+def test_every_shipped_profanity_is_a_candidate():
+    vocabulary = _vocabulary()
+    for word in vocabulary:
+        assert tokens.candidate_words(f'what a {word}!', vocabulary) == [
+            word.lower()
+        ], word
+
+
+def test_token_stats_batch_matches_between_paths():
+    vocabulary = _vocabulary()
+    texts = ['you b1tch, what an arseh0le', None, 'sh1ts and c0ck ups'] * 50
+    single = tokens.token_stats_batch(texts, vocabulary=vocabulary)
+    multi = tokens.token_stats_batch(
+        texts, vocabulary=vocabulary, processes=2, chunksize=16
+    )
+    assert single == multi
+    assert single[1][0] == ['b1tch', 'arseh0le']
+    assert single[1][2] == ['sh1ts', 'c0ck']